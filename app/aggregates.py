@@ -0,0 +1,98 @@
+import threading
+from collections import Counter
+
+
+class CatalogAggregates:
+    """Счётчики тегов, языков и владельцев с индексом тег -> id пакетов.
+
+    Поддерживаются инкрементально через подписку на CatalogStore, поэтому
+    страница категорий и список пакетов по тегу не обходят весь каталог.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tag_counts = Counter()
+        self.language_counts = Counter()
+        self.owner_counts = Counter()
+        self._tag_index = {}
+
+    @staticmethod
+    def _keys(package):
+        tags = set(package.get("topics") or [])
+        language = package.get("language")
+        owner = (package.get("owner") or {}).get("login")
+        return tags, language, owner
+
+    def _add(self, package_id, package):
+        tags, language, owner = self._keys(package)
+        for tag in tags:
+            self.tag_counts[tag] += 1
+            self._tag_index.setdefault(tag, set()).add(package_id)
+        if language:
+            self.language_counts[language] += 1
+        if owner:
+            self.owner_counts[owner] += 1
+
+    def _remove(self, package_id, package):
+        tags, language, owner = self._keys(package)
+        for tag in tags:
+            self.tag_counts[tag] -= 1
+            if self.tag_counts[tag] <= 0:
+                del self.tag_counts[tag]
+            ids = self._tag_index.get(tag)
+            if ids is not None:
+                ids.discard(package_id)
+                if not ids:
+                    del self._tag_index[tag]
+        if language:
+            self.language_counts[language] -= 1
+            if self.language_counts[language] <= 0:
+                del self.language_counts[language]
+        if owner:
+            self.owner_counts[owner] -= 1
+            if self.owner_counts[owner] <= 0:
+                del self.owner_counts[owner]
+
+    def rebuild(self, packages):
+        with self._lock:
+            self.tag_counts = Counter()
+            self.language_counts = Counter()
+            self.owner_counts = Counter()
+            self._tag_index = {}
+            for package_id, package in enumerate(packages):
+                self._add(package_id, package)
+
+    def snapshot_state(self):
+        with self._lock:
+            return self.tag_counts, self.language_counts, self.owner_counts, self._tag_index
+
+    def restore_state(self, state):
+        with self._lock:
+            self.tag_counts, self.language_counts, self.owner_counts, self._tag_index = state
+
+    def apply_changes(self, changes):
+        with self._lock:
+            for package_id, old_package, new_package in changes:
+                if old_package is not None:
+                    self._remove(package_id, old_package)
+                if new_package is not None:
+                    self._add(package_id, new_package)
+
+    def tags(self):
+        """Теги, отсортированные по количеству пакетов"""
+        with self._lock:
+            return self.tag_counts.most_common()
+
+    def languages(self):
+        with self._lock:
+            return self.language_counts.most_common()
+
+    def owners(self, limit=None):
+        """Владельцы, отсортированные по количеству пакетов (не больше limit)"""
+        with self._lock:
+            return self.owner_counts.most_common(limit)
+
+    def ids_for_tag(self, tag):
+        """id пакетов с тегом в порядке каталога"""
+        with self._lock:
+            return sorted(self._tag_index.get(tag, ()))
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from urllib.parse import quote
+
+import anyio
+from starlette.responses import Response
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+CHUNK_SIZE = 256 * 1024
+
+
+class ArtifactStore:
+    """Локальное зеркало .ryx-файлов релизов, адресуемое по SHA-256.
+
+    Каждый ассет скачивается с GitHub один раз и хранится как
+    directory/ab/abcdef... (первые два символа хеша - подкаталог).
+    Одинаковые файлы разных релизов хранятся в одном экземпляре.
+    """
+
+    def __init__(self, directory, max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._inflight = {}
+
+    def path_for(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def has(self, digest):
+        return bool(digest) and SHA256_RE.match(digest) is not None and os.path.isfile(self.path_for(digest))
+
+    async def fetch(self, url, download):
+        """Зеркалирует url и возвращает (sha256, размер).
+
+        download(url, write, max_bytes) - например, GitHubClient.download.
+        Одновременные запросы одного url ждут одну загрузку.
+        """
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, download))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url, download):
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".download-", suffix=".tmp")
+        try:
+            # Запись и fsync идут в потоках anyio, чтобы не останавливать цикл событий
+            async with anyio.wrap_file(os.fdopen(fd, "wb")) as f:
+                async def write(chunk):
+                    digest.update(chunk)
+                    await f.write(chunk)
+                size = await download(url, write, self.max_bytes)
+                await f.flush()
+                await anyio.to_thread.run_sync(os.fsync, f.wrapped.fileno())
+            sha256 = digest.hexdigest()
+            path = self.path_for(sha256)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            return sha256, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def response(self, digest, request, filename=None, immutable=False):
+        return ArtifactResponse(self.path_for(digest), digest, request, filename, immutable)
+
+
+def artifact_headers(digest, filename=None, immutable=False):
+    headers = {
+        "etag": f'"{digest}"',
+        "accept-ranges": "bytes",
+        "x-checksum-sha256": digest,
+        "cache-control": "public, max-age=31536000, immutable" if immutable else "no-cache",
+    }
+    if filename:
+        headers["content-disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+    return headers
+
+
+def metadata_response(digest, size, filename=None):
+    """Ответ на HEAD по известным хешу и размеру, без файла на диске"""
+    headers = artifact_headers(digest, filename)
+    headers["content-length"] = str(size)
+    return Response(headers=headers, media_type=ArtifactResponse.media_type)
+
+
+class ArtifactResponse(Response):
+    """Отдача файла артефакта с поддержкой Range, If-None-Match и HEAD.
+
+    Если сервер поддерживает ASGI-расширение zerocopysend, тело
+    отправляется через sendfile без копирования в память процесса.
+    """
+
+    media_type = "application/octet-stream"
+
+    def __init__(self, path, digest, request, filename=None, immutable=False):
+        self.path = path
+        self.digest = digest
+        self.background = None
+        self.send_header_only = request.method == "HEAD"
+        self.size = os.path.getsize(path)
+        self.range = None
+
+        etag = f'"{digest}"'
+        headers = artifact_headers(digest, filename, immutable)
+
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            self.status_code = 304
+        else:
+            self.status_code = 200
+            range_header = request.headers.get("range")
+            if_range = request.headers.get("if-range")
+            if range_header and (if_range is None or if_range == etag):
+                self._parse_range(range_header, headers)
+
+        if self.status_code == 200:
+            headers["content-length"] = str(self.size)
+        self.init_headers(headers)
+
+    def _parse_range(self, range_header, headers):
+        # Поддерживается один диапазон; несколько диапазонов - отдаём файл целиком
+        match = RANGE_RE.match(range_header.strip())
+        if not match or match.group(1) == match.group(2) == "":
+            return
+        start, end = match.groups()
+        if start == "":
+            start, end = max(self.size - int(end), 0), self.size - 1
+        elif end and int(end) < int(start):
+            # Конец раньше начала - синтаксически неверный диапазон: заголовок игнорируется (RFC 9110)
+            return
+        else:
+            start, end = int(start), min(int(end), self.size - 1) if end else self.size - 1
+        if start >= self.size or start > end:
+            self.status_code = 416
+            headers["content-range"] = f"bytes */{self.size}"
+            headers["content-length"] = "0"
+            return
+        self.status_code = 206
+        self.range = (start, end - start + 1)
+        headers["content-range"] = f"bytes {start}-{end}/{self.size}"
+        headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or self.status_code in (304, 416):
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        offset, count = self.range or (0, self.size)
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f,
+                            "offset": offset, "count": count, "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(offset)
+            remaining = count
+            while True:
+                chunk = await f.read(min(CHUNK_SIZE, remaining)) if remaining > 0 else b""
+                remaining -= len(chunk)
+                more_body = remaining > 0 and len(chunk) > 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                if not more_body:
+                    break
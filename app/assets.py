@@ -0,0 +1,281 @@
+"""Сборка статических файлов: вендоринг, минификация, отпечатки и сжатие.
+
+Из каталога app/ (вызывается и из python startup.py):
+
+    python assets.py
+
+скачивает внешние библиотеки (VENDOR) в static/vendor/, если их там
+ещё нет, минифицирует свои css/js и копирует всю статику в static/dist/
+под именами с хешем содержимого. Рядом с текстовыми файлами кладутся
+.gz и .br (если установлен пакет brotli), а в static/dist/manifest.json -
+соответствие исходных имён собранным. Шаблоны получают адреса через
+asset_url(); без сборки используются исходные файлы и CDN.
+
+static/vendor/ и static/dist/ хранятся в репозитории, потому что Vercel
+не запускает сборку; их пересобирает workflow
+.github/workflows/deploy-artifacts.yml при изменении статики.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import sys
+
+from starlette.staticfiles import StaticFiles
+
+# Внешние библиотеки: путь в static/ -> исходный адрес (он же запасной, если сборки нет)
+VENDOR = {
+    "vendor/bootstrap/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css",
+    "vendor/bootstrap/bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js",
+    "vendor/fontawesome/css/all.min.css": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css",
+}
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Что имеет смысл сжимать заранее (woff2, png и т.п. уже сжаты)
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".ttf", ".eot", ".map")
+
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+CSS_COMMENT_RE = re.compile(r"/\*(?!!).*?\*/", re.S)
+JS_BLOCK_COMMENT_RE = re.compile(r"^\s*/\*.*?\*/\s*$", re.S | re.M)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def minify_css(text):
+    """Удаляет комментарии и лишние пробелы (пробел перед ':' сохраняется - он значим в селекторах)"""
+    text = CSS_COMMENT_RE.sub("", text)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}").strip()
+
+
+def minify_js(text):
+    """Осторожная минификация без парсера: отступы, пустые строки и комментарии на отдельных строках"""
+    text = JS_BLOCK_COMMENT_RE.sub("", text)
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+def fingerprinted(name, content):
+    """css/style.css -> css/style.1a2b3c4d5e6f.css"""
+    root, ext = posixpath.splitext(name)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def css_references(text):
+    """Относительные ссылки url(...) в CSS без data:, абсолютных адресов и якорей"""
+    for _, url in CSS_URL_RE.findall(text):
+        url = url.strip()
+        if url and not url.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            yield url
+
+
+def _download(url):
+    import httpx
+    response = httpx.get(url, follow_redirects=True, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+
+def vendor(static_dir, download=_download):
+    """Скачивает VENDOR и файлы, на которые ссылается их CSS (шрифты); уже скачанные не трогает"""
+    for name, url in VENDOR.items():
+        pending = [(name, url)]
+        while pending:
+            name, url = pending.pop()
+            path = os.path.join(static_dir, *name.split("/"))
+            if not os.path.exists(path):
+                try:
+                    content = download(url)
+                except Exception as e:
+                    print(f"Error vendoring {url}: {e}")
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(content)
+            if name.endswith(".css"):
+                with open(path, encoding="utf-8") as f:
+                    text = f.read()
+                for reference in set(css_references(text)):
+                    target = reference.split("?")[0].split("#")[0]
+                    pending.append((posixpath.normpath(posixpath.join(posixpath.dirname(name), target)),
+                                    posixpath.join(posixpath.dirname(url), target)))
+
+
+def _source_files(static_dir):
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if not (root == static_dir and d in (DIST_DIR, DIST_DIR + ".tmp")))
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            yield os.path.relpath(path, static_dir).replace(os.sep, "/"), path
+
+
+def _rewrite_css(name, text, files):
+    # Ссылки на другие файлы статики заменяются собранными именами (относительно самого CSS)
+    def replace(match):
+        quote, url = match.groups()
+        url = url.strip()
+        split = re.search(r"[?#]", url)
+        target, suffix = (url[:split.start()], url[split.start():]) if split else (url, "")
+        resolved = posixpath.normpath(posixpath.join(posixpath.dirname(name), target))
+        if resolved not in files:
+            return match.group(0)
+        new_target = posixpath.join(posixpath.dirname(target), posixpath.basename(files[resolved]))
+        return f"url({quote}{new_target}{suffix}{quote})"
+    return CSS_URL_RE.sub(replace, text)
+
+
+def build(static_dir="static"):
+    """Собирает static/dist/ и manifest.json; возвращает манифест"""
+    vendor(static_dir)
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    tmp_dir = dist_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    files = {}
+    encodings = {}
+    # CSS собирается последним: в нём переписываются ссылки на уже собранные шрифты и картинки
+    sources = sorted(_source_files(static_dir), key=lambda item: item[0].endswith(".css"))
+    for name, path in sources:
+        with open(path, "rb") as f:
+            content = f.read()
+        minified = ".min." in posixpath.basename(name)
+        if name.endswith(".css"):
+            text = content.decode("utf-8")
+            text = _rewrite_css(name, text if minified else minify_css(text), files)
+            content = text.encode("utf-8")
+        elif name.endswith(".js") and not minified:
+            content = minify_js(content.decode("utf-8")).encode("utf-8")
+
+        built = fingerprinted(name, content)
+        files[name] = built
+        encodings[built] = _write_variants(os.path.join(tmp_dir, *built.split("/")), content)
+
+    manifest = {"files": files, "encodings": encodings}
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.replace(tmp_dir, dist_dir)
+    return manifest
+
+
+def _write_variants(path, content):
+    """Пишет файл и его сжатые варианты (только если они заметно меньше); возвращает кодировки"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    if not path.endswith(COMPRESSIBLE):
+        return []
+
+    variants = []
+    # mtime=0 - одинаковый результат при одинаковом содержимом
+    compressed = {"gzip": (".gz", gzip.compress(content, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        compressed["br"] = (".br", brotli.compress(content, quality=11))
+    for encoding, (suffix, data) in compressed.items():
+        if len(data) < len(content) * 0.9:
+            with open(path + suffix, "wb") as f:
+                f.write(data)
+            variants.append(encoding)
+    return sorted(variants)
+
+
+class AssetManifest:
+    """Адреса собранной статики для шаблонов (asset_url)"""
+
+    def __init__(self, static_dir="static", prefix="/static/"):
+        self.prefix = prefix
+        self.files = {}
+        self.encodings = {}
+        path = os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    manifest = json.load(f)
+                self.files = manifest.get("files", {})
+                self.encodings = manifest.get("encodings", {})
+            except (OSError, ValueError) as e:
+                print(f"Error loading asset manifest: {e}")
+
+    def url(self, name):
+        if name in self.files:
+            return f"{self.prefix}{DIST_DIR}/{self.files[name]}"
+        if name in VENDOR:
+            return VENDOR[name]
+        return f"{self.prefix}{name}"
+
+
+class AssetFiles(StaticFiles):
+    """StaticFiles с долгим кешированием собранных файлов и отдачей готовых .br/.gz.
+
+    Файлы из dist/ неизменяемы (имя содержит хеш), поэтому отдаются с
+    Cache-Control: immutable; сжатая версия выбирается по Accept-Encoding.
+    """
+
+    def __init__(self, *args, manifest=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path, scope):
+        path = path.replace(os.sep, "/")
+        if not path.startswith(DIST_DIR + "/"):
+            return await super().get_response(path, scope)
+
+        built = path[len(DIST_DIR) + 1:]
+        available = self.manifest.encodings.get(built, []) if self.manifest else []
+        encoding = _negotiate(scope, available)
+        suffix = {"br": ".br", "gzip": ".gz"}.get(encoding, "")
+        response = await super().get_response(path + suffix, scope)
+        if encoding:
+            response.headers["content-encoding"] = encoding
+            response.headers["content-type"] = _media_type(path)
+        if available:
+            response.headers["vary"] = "Accept-Encoding"
+        if response.status_code in (200, 304):
+            response.headers["cache-control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+def _media_type(path):
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+def _negotiate(scope, available):
+    """Лучшая из доступных кодировок, которую принимает клиент (br предпочтительнее gzip)"""
+    if not available:
+        return None
+    accepted = set()
+    for name, value in scope.get("headers", []):
+        if name != b"accept-encoding":
+            continue
+        for item in value.decode("latin-1").split(","):
+            coding, _, params = item.strip().partition(";")
+            if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(coding.strip().lower())
+    for encoding in ("br", "gzip"):
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print("usage: python assets.py  (builds static/dist/ from static/)")
+        sys.exit(1)
+    manifest = build()
+    print(f"{len(manifest['files'])} assets built into static/{DIST_DIR}/"
+          + ("" if brotli is not None else " (brotli is not installed: .br variants skipped)"))
@@ -0,0 +1,47 @@
+import secrets
+import time
+
+
+class BulkImportJob:
+    """Состояние массового импорта репозиториев для эндпоинта прогресса.
+
+    Сам импорт выполняет main.run_bulk_import: проверка владельцев (один
+    раз на владельца), одновременная загрузка метаданных и одна запись
+    в каталог. Задача видна только пользователю, который её запустил.
+    """
+
+    def __init__(self, login, repo_urls):
+        self.id = secrets.token_urlsafe(12)
+        self.login = login
+        self.repo_urls = repo_urls
+        self.status = "running"
+        self.stage = "checking"
+        self.fetched = 0
+        self.added = []  # id добавленных пакетов
+        self.skipped = []  # {"github_url": ..., "reason": ...}
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+
+    def skip(self, github_url, reason):
+        self.skipped.append({"github_url": github_url, "reason": reason})
+
+    def finish(self, error=None):
+        self.status = "failed" if error else "finished"
+        self.stage = "done"
+        self.error = error
+        self.finished_at = time.time()
+
+    def progress(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "total": len(self.repo_urls),
+            "fetched": self.fetched,
+            "added": self.added,
+            "skipped": self.skipped,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+import time
+
+# Версия формата файла прогресса: файлы других версий не продолжаются
+CHECKPOINT_FORMAT = 2
+
+
+class BulkRefreshJob:
+    """Фоновое обновление всего каталога из GitHub.
+
+    Пакеты обновляются пачками по batch_size (для GraphQL - один запрос
+    на пачку) параллельно, не больше concurrency пачек одновременно,
+    а перед каждой пачкой проверяется остаток лимита GitHub API того
+    токена и ресурса (core или graphql), которыми пользуется update_func:
+    если он подходит к концу, задача ждёт сброса лимита.
+
+    update_func(пакеты) возвращает обновлённые записи; None вместо записи -
+    загрузка не удалась (лимит, сеть), такой пакет попадает в failed и
+    обрабатывается заново при следующем запуске. Результатом считаются
+    только изменённые обновлением поля; в конце они переносятся в текущие
+    записи каталога одним сохранением, и поле, которое за это время
+    изменил кто-то другой (вебхук, проверка файла), не перезаписывается.
+
+    Прогресс периодически сохраняется в state_path, поэтому прерванную
+    задачу можно продолжить с того же места, если она начата не раньше
+    чем checkpoint_ttl секунд назад.
+    """
+
+    def __init__(self, catalog, update_func, github, state_path="bulk_refresh_state.json",
+                 concurrency=5, batch_size=1, requests_per_batch=4, checkpoint_every=20,
+                 checkpoint_ttl=6 * 3600, rate_limit_token=None, rate_limit_resource="core"):
+        self.catalog = catalog
+        self.update_func = update_func
+        self.github = github
+        self.state_path = state_path
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.requests_per_batch = requests_per_batch
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_ttl = checkpoint_ttl
+        self.rate_limit_token = rate_limit_token
+        self.rate_limit_resource = rate_limit_resource
+        self._task = None
+        self._reset_state()
+
+    def _reset_state(self):
+        self.status = "idle"
+        self.total = 0
+        self.done = set()  # github_url обработанных пакетов (без неудачных)
+        self.failed = []
+        self.results = {}  # github_url -> изменения (см. record_delta)
+        self.started_at = None
+        self.finished_at = None
+        self.waiting_until = None
+        self._checkpointed = 0
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def progress(self):
+        """Состояние задачи для эндпоинта статуса"""
+        return {
+            "status": self.status,
+            "total": self.total,
+            "processed": len(self.done) + len(self.failed),
+            "updated": len(self.results),
+            "failed": len(self.failed),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "waiting_for_rate_limit_until": self.waiting_until,
+            "rate_limit_remaining": self.github.rate_limit(self.rate_limit_token, self.rate_limit_resource)[0],
+        }
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.state_path):
+            return False
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        # Файл другого формата или давно начатой задачи: её результаты устарели
+        started_at = state.get("started_at") or 0
+        if state.get("format") != CHECKPOINT_FORMAT or time.time() - started_at > self.checkpoint_ttl:
+            os.remove(self.state_path)
+            return False
+        # Неудачные пакеты не попадают в done, поэтому при продолжении загружаются заново
+        self.done = set(state.get("done", []))
+        self.results = state.get("results", {})
+        self.started_at = started_at
+        return True
+
+    def _save_checkpoint(self):
+        state = {
+            "format": CHECKPOINT_FORMAT,
+            "done": sorted(self.done),
+            "failed": self.failed,
+            "results": self.results,
+            "started_at": self.started_at,
+        }
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+        self._checkpointed = len(self.done) + len(self.failed)
+
+    def start(self):
+        """Запускает задачу (или продолжает прерванную); возвращает False, если она уже идёт"""
+        if self.running:
+            return False
+        self._reset_state()
+        resumed = self._load_checkpoint()
+        if not resumed:
+            self.started_at = time.time()
+        self.status = "running"
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return True
+
+    async def _pace(self):
+        # Оставляем запас на все параллельные запросы, которые могут быть в полёте
+        reserve = self.concurrency * self.requests_per_batch
+        delay = self.github.rate_limit_wait(reserve, self.rate_limit_token, self.rate_limit_resource)
+        if delay > 0:
+            self.waiting_until = time.time() + delay
+            await asyncio.sleep(delay)
+            self.waiting_until = None
+
+    async def _worker(self, queue):
+        while True:
+            try:
+                batch = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._pace()
+            try:
+                updated_packages = await self.update_func(batch)
+            except Exception as e:
+                print(f"Error refreshing batch: {e}")
+                updated_packages = None
+
+            for i, package in enumerate(batch):
+                github_url = package["github_url"]
+                updated_package = updated_packages[i] if updated_packages is not None else None
+                if updated_package is None:
+                    self.failed.append(github_url)
+                    continue
+                delta = record_delta(package, updated_package)
+                if delta:
+                    self.results[github_url] = delta
+                self.done.add(github_url)
+
+            if len(self.done) + len(self.failed) - self._checkpointed >= self.checkpoint_every:
+                self._save_checkpoint()
+
+    async def _run(self):
+        try:
+            packages = [p for p in self.catalog.all() if p.get("github_url")]
+            self.total = len(packages)
+
+            pending = [p for p in packages if p["github_url"] not in self.done]
+            queue = asyncio.Queue()
+            for start in range(0, len(pending), self.batch_size):
+                queue.put_nowait(pending[start:start + self.batch_size])
+
+            await asyncio.gather(*(self._worker(queue) for _ in range(self.concurrency)))
+            self._save_checkpoint()
+
+            # Все результаты переносим в текущие записи каталога одним сохранением
+            results = self.results
+            def apply_results(current):
+                for i, package in enumerate(current):
+                    delta = results.get(package.get("github_url"))
+                    if delta is not None:
+                        current[i] = merge_delta(package, delta)
+
+            if results:
+                self.catalog.mutate(apply_results)
+            if self.failed:
+                # Для повторного запуска остаются только неудачные пакеты
+                self.results = {}
+                self._save_checkpoint()
+            else:
+                os.remove(self.state_path)
+            self.status = "finished"
+        except Exception as e:
+            print(f"Bulk refresh failed: {e}")
+            self.status = "failed"
+        finally:
+            self.finished_at = time.time()
+
+
+def record_delta(original, updated):
+    """Поля, изменённые обновлением: {"old": {...}, "new": {...}, "fields": [...]} или None.
+
+    Поля нет в old - его не было в записи, нет в new - обновление его удалило.
+    """
+    fields = sorted(field for field in set(original) | set(updated)
+                    if (field in original) != (field in updated) or original.get(field) != updated.get(field))
+    if not fields:
+        return None
+    return {
+        "old": {field: original[field] for field in fields if field in original},
+        "new": {field: updated[field] for field in fields if field in updated},
+        "fields": fields,
+    }
+
+
+def merge_delta(current, delta):
+    """Переносит изменения record_delta в текущую запись; поля, изменённые после загрузки, не трогает"""
+    merged = dict(current)
+    for field in delta["fields"]:
+        old = delta["old"]
+        if (field in current) != (field in old) or current.get(field) != old.get(field):
+            continue
+        if field in delta["new"]:
+            merged[field] = delta["new"][field]
+        else:
+            merged.pop(field, None)
+    return merged
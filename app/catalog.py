@@ -0,0 +1,427 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import tempfile
+import threading
+import time
+
+from metrics import timed
+from storage import DuplicatePackageError, StaleCatalogError, parse_repo_url, repo_key
+
+# Сколько раз mutate повторяет изменение, если каталог успел записать другой воркер
+WRITE_ATTEMPTS = 5
+
+# Формат снимка каталога (write_snapshot): снимок другого формата не загружается
+SNAPSHOT_FORMAT = 2
+
+
+def _state_version(listener):
+    """Хеш исходного кода модуля подписчика или None.
+
+    Состояние индекса в снимке подходит только тому коду, который его
+    построил: после изменения модуля подписчик перестраивается заново.
+    """
+    module = sys.modules.get(type(listener).__module__)
+    try:
+        with open(module.__file__, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except (AttributeError, TypeError, OSError):
+        return None
+
+
+class CatalogStore:
+    """Каталог пакетов в памяти процесса с записью в хранилище.
+
+    Хранилище (storage.JsonStorage или storage.SQLiteStorage) читается
+    один раз, дальше все чтения обслуживаются из памяти. Записи
+    сериализуются через блокировку и сразу сохраняются в хранилище.
+    Если хранилище изменил другой воркер, каталог перечитывается; запись
+    принимается хранилищем, только если оно не менялось с момента чтения
+    (иначе mutate перечитывает каталог и повторяет изменение).
+
+    Один репозиторий - один пакет: дубликаты определяются по owner/repo
+    (storage.repo_key), а не по написанию адреса; новые пакеты хранят
+    канонический адрес https://github.com/owner/repo.
+
+    Подписчики (см. subscribe) получают изменения каталога, чтобы
+    поддерживать свои индексы инкрементально. Записи пакетов считаются
+    неизменяемыми: изменённый пакет всегда заменяется новым словарём.
+    При сохранении новые и изменённые записи получают поле modified_at.
+
+    У каждого пакета есть постоянный id (слаг из owner/repo), по которому
+    строятся ссылки; позиция в списке - внутренний номер для индексов
+    подписчиков. Старые числовые ссылки переводятся в id через таблицу
+    редиректов (redirects_path).
+    """
+
+    def __init__(self, storage, redirects_path=None):
+        self.storage = storage
+        self.redirects_path = redirects_path
+        self.redirects = {}
+        self._lock = threading.RLock()
+        self._packages = []
+        self._stamp = None
+        self._keys = PackageKeys()
+        self._listeners = [self._keys]
+        self._snapshot_states = {}
+        self.version = 0
+
+    def subscribe(self, listener):
+        """Подписывает объект с методами rebuild(packages) и apply_changes(changes).
+
+        Если каталог загружен из снимка и в нём есть состояние такого
+        подписчика, построенное той же версией его кода, вместо rebuild
+        вызывается listener.restore_state(state). Если восстановить
+        состояние не удалось, индекс строится обычным rebuild.
+        """
+        self._listeners.append(listener)
+        name = type(listener).__name__
+        version, state = self._snapshot_states.pop(name, (None, None))
+        if version is not None and hasattr(listener, "restore_state") and version == _state_version(listener):
+            try:
+                listener.restore_state(state)
+                return
+            except Exception as e:
+                print(f"Error restoring {name} from catalog snapshot: {e}")
+        listener.rebuild(self._packages)
+
+    def load(self):
+        """Загружает каталог из хранилища (вызывается при старте)"""
+        with self._lock:
+            stamp = self.storage.stamp()
+            with timed("catalog_load"):
+                packages = _assign_ids(self.storage.load())
+            self._packages = packages
+            self._stamp = stamp
+            self._snapshot_states = {}
+            self.version += 1
+            for listener in self._listeners:
+                listener.rebuild(packages)
+            self._load_redirects()
+            return packages
+
+    def _load_redirects(self):
+        """Таблица старых числовых ссылок: позиция -> id; создаётся один раз по текущему порядку"""
+        if not self.redirects_path:
+            return
+        if os.path.exists(self.redirects_path):
+            with open(self.redirects_path, "r") as f:
+                self.redirects = json.load(f)
+            return
+        self.redirects = {str(i): package["id"] for i, package in enumerate(self._packages)}
+        try:
+            with open(self.redirects_path, "w") as f:
+                json.dump(self.redirects, f, indent=2)
+        except OSError as e:
+            print(f"Error saving redirects: {e}")
+
+    def load_snapshot(self, path):
+        """Загружает каталог вместе с готовыми индексами подписчиков из снимка.
+
+        Снимок собирается при деплое (python startup.py) и принимается, только
+        если совпадает с содержимым хранилища и имеет текущий формат
+        (SNAPSHOT_FORMAT); иначе возвращается False и каталог нужно загрузить
+        обычным load(). Состояние каждого подписчика проверяется отдельно
+        при subscribe. Снимок - pickle, поэтому он
+        должен быть частью деплоя, а не приходить извне.
+        """
+        fingerprint = self.storage.fingerprint()
+        if fingerprint is None or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            print(f"Error loading catalog snapshot: {e}")
+            return False
+        if not isinstance(snapshot, dict) or snapshot.get("format") != SNAPSHOT_FORMAT:
+            print("Error loading catalog snapshot: unsupported format, rebuild it with startup.py")
+            return False
+        if snapshot.get("fingerprint") != fingerprint:
+            return False
+
+        with self._lock:
+            self._packages = snapshot["packages"]
+            self._stamp = self.storage.stamp()
+            self._snapshot_states = snapshot["listeners"]
+            self.version += 1
+            for listener in self._listeners:
+                listener.rebuild(self._packages)
+            self._load_redirects()
+        return True
+
+    def write_snapshot(self, path):
+        """Сохраняет каталог и состояние подписчиков (snapshot_state) с версией их кода в снимок"""
+        with self._lock:
+            snapshot = {
+                "format": SNAPSHOT_FORMAT,
+                "fingerprint": self.storage.fingerprint(),
+                "packages": self._packages,
+                "listeners": {type(listener).__name__: (_state_version(listener), listener.snapshot_state())
+                              for listener in self._listeners if hasattr(listener, "snapshot_state")},
+            }
+            directory = os.path.dirname(os.path.abspath(path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+    def _reload_if_changed(self):
+        if self.storage.stamp() != self._stamp:
+            with self._lock:
+                if self.storage.stamp() != self._stamp:
+                    self.load()
+
+    def all(self):
+        """Возвращает текущий список пакетов (не изменять на месте)"""
+        self._reload_if_changed()
+        return self._packages
+
+    def get(self, index):
+        packages = self.all()
+        if index < 0 or index >= len(packages):
+            return None
+        return packages[index]
+
+    def get_by_id(self, package_id):
+        """Пакет по постоянному id или None"""
+        index = self.index_of(package_id)
+        return None if index is None else self._packages[index]
+
+    def index_of(self, package_id):
+        """Позиция пакета с данным id или None"""
+        self._reload_if_changed()
+        return self._keys.by_id.get(package_id)
+
+    def find(self, github_url):
+        """Индекс пакета репозитория по адресу в любой форме (http, .git, /tree/...) или None"""
+        self._reload_if_changed()
+        return self._keys.by_repo.get(repo_key(github_url))
+
+    def find_repo(self, owner, repo):
+        """Индекс пакета репозитория owner/repo или None (для вебхуков, добавления и импорта)"""
+        self._reload_if_changed()
+        return self._keys.by_repo.get(repo_key(f"github.com/{owner}/{repo}"))
+
+    def owned_by(self, login):
+        """Индексы пакетов, принадлежащих пользователю или добавленных им"""
+        self._reload_if_changed()
+        return sorted(self._keys.by_owner.get(login.lower(), ()))
+
+    def resolve_legacy_id(self, number):
+        """id пакета для старой числовой ссылки /package/<номер> или None"""
+        package_id = self.redirects.get(str(number))
+        return package_id if self.index_of(package_id) is not None else None
+
+    def save(self, packages):
+        """Полностью заменяет каталог и сохраняет его в хранилище.
+
+        Если хранилище изменил другой воркер после последнего чтения,
+        каталог перечитывается и выбрасывается StaleCatalogError.
+        """
+        with self._lock:
+            packages = list(packages)
+            changes = _diff(self._packages, packages)
+            if not changes:
+                return
+            # Время изменения хранится в самой записи, чтобы все воркеры видели одно значение;
+            # новые записи получают id, заменённые сохраняют прежний
+            now = time.time()
+            used_ids = {p.get("id") for p in packages}
+            for n, (i, old_package, new_package) in enumerate(changes):
+                if new_package is not None:
+                    new_package = dict(new_package, modified_at=now)
+                    if not new_package.get("id"):
+                        if old_package is not None and old_package.get("id") and \
+                                repo_key(old_package.get("github_url")) == repo_key(new_package.get("github_url")):
+                            new_package["id"] = old_package["id"]
+                        else:
+                            new_package["id"] = _unique_slug(package_slug(new_package), used_ids)
+                        used_ids.add(new_package["id"])
+                    packages[i] = new_package
+                    changes[n] = (i, old_package, new_package)
+            try:
+                with timed("catalog_save"):
+                    stamp = self.storage.write(packages, changes, self._stamp)
+            except StaleCatalogError:
+                self.load()
+                raise
+            self._packages = packages
+            self._stamp = stamp
+            self.version += 1
+            for listener in self._listeners:
+                listener.apply_changes(changes)
+
+    def mutate(self, func):
+        """Выполняет func(packages) над копией каталога под блокировкой и сохраняет результат.
+
+        Если другой воркер записал каталог раньше, func выполняется заново
+        над перечитанным каталогом, поэтому она не должна иметь побочных эффектов.
+        """
+        with self._lock:
+            for attempt in range(WRITE_ATTEMPTS):
+                self._reload_if_changed()
+                packages = list(self._packages)
+                result = func(packages)
+                try:
+                    self.save(packages)
+                except StaleCatalogError:
+                    if attempt == WRITE_ATTEMPTS - 1:
+                        raise
+                    continue
+                return result
+
+    def add(self, package):
+        """Добавляет пакет и возвращает его id; повторный репозиторий - DuplicatePackageError"""
+        return self.add_many([package], raise_duplicates=True)[0]
+
+    def add_many(self, new_packages, raise_duplicates=False):
+        """Добавляет пакеты одним сохранением; возвращает их id (None - репозиторий уже в каталоге)"""
+        new_packages = [canonical_package(package) for package in new_packages]
+
+        def _append(packages):
+            positions = []
+            seen = set()
+            for package in new_packages:
+                key = repo_key(package.get("github_url"))
+                if key and (key in self._keys.by_repo or key in seen):
+                    if raise_duplicates:
+                        raise DuplicatePackageError(package["github_url"])
+                    positions.append(None)
+                    continue
+                seen.add(key)
+                packages.append(package)
+                positions.append(len(packages) - 1)
+            return positions
+        positions = self.mutate(_append)
+        return [None if i is None else self._packages[i]["id"] for i in positions]
+
+    def update(self, package_id, package):
+        """Заменяет запись пакета с данным id (id сохраняется)"""
+        def _replace(packages):
+            index = self._keys.by_id.get(package_id)
+            if index is None:
+                raise KeyError(package_id)
+            packages[index] = dict(package, id=package_id)
+        self.mutate(_replace)
+
+    def replace(self, github_url, func):
+        """Заменяет запись репозитория github_url на func(запись) под блокировкой каталога"""
+        def _replace(packages):
+            index = self._keys.by_repo.get(repo_key(github_url))
+            if index is not None:
+                packages[index] = func(packages[index])
+        self.mutate(_replace)
+
+
+class PackageKeys:
+    """Хеш-таблицы каталога: id, owner/repo и владелец -> позиция пакета.
+
+    Подписчик CatalogStore, поэтому поиск пакета не обходит весь список.
+    """
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_repo = {}
+        self.by_owner = {}
+
+    @staticmethod
+    def _keys(package):
+        owners = {(package.get("owner") or {}).get("login"), package.get("submitted_by")}
+        return (package.get("id"), repo_key(package.get("github_url")),
+                {owner.lower() for owner in owners if owner})
+
+    def _add(self, index, package):
+        package_id, repo, owners = self._keys(package)
+        if package_id:
+            self.by_id[package_id] = index
+        if repo:
+            self.by_repo[repo] = index
+        for owner in owners:
+            self.by_owner.setdefault(owner, set()).add(index)
+
+    def _remove(self, index, package):
+        package_id, repo, owners = self._keys(package)
+        for table, key in ((self.by_id, package_id), (self.by_repo, repo)):
+            if key and table.get(key) == index:
+                del table[key]
+        for owner in owners:
+            indexes = self.by_owner.get(owner)
+            if indexes is not None:
+                indexes.discard(index)
+                if not indexes:
+                    del self.by_owner[owner]
+
+    def rebuild(self, packages):
+        self.by_id, self.by_repo, self.by_owner = {}, {}, {}
+        for index, package in enumerate(packages):
+            self._add(index, package)
+
+    def apply_changes(self, changes):
+        # Сначала убираем все старые ключи: при сдвиге записей ключ может перейти на другую позицию
+        for index, old_package, new_package in changes:
+            if old_package is not None:
+                self._remove(index, old_package)
+        for index, old_package, new_package in changes:
+            if new_package is not None:
+                self._add(index, new_package)
+
+
+def package_slug(package):
+    """Слаг для id пакета: owner-repo из github_url (или имя пакета)"""
+    source = repo_key(package.get("github_url")) or (package.get("name") or "").lower()
+    return re.sub(r"[^a-z0-9._]+", "-", source.lower()).strip("-.") or "package"
+
+
+def _unique_slug(slug, used_ids):
+    candidate, n = slug, 2
+    while candidate in used_ids:
+        candidate, n = f"{slug}-{n}", n + 1
+    return candidate
+
+
+def _assign_ids(packages):
+    """Выдаёт id записям без него (каталог, созданный до появления id)"""
+    if all(p.get("id") for p in packages):
+        return packages
+    used_ids = {p.get("id") for p in packages}
+    result = []
+    for package in packages:
+        if not package.get("id"):
+            package = dict(package, id=_unique_slug(package_slug(package), used_ids))
+            used_ids.add(package["id"])
+        result.append(package)
+    return result
+
+
+def canonical_github_url(github_url):
+    """https://github.com/owner/repo для адреса репозитория в любой форме или None"""
+    parsed = parse_repo_url(github_url)
+    return f"https://github.com/{parsed[0]}/{parsed[1]}" if parsed else None
+
+
+def canonical_package(package):
+    """Запись с каноническим github_url (если адрес разбирается)"""
+    github_url = canonical_github_url(package.get("github_url"))
+    if not github_url or github_url == package.get("github_url"):
+        return package
+    return dict(package, github_url=github_url)
+
+
+def _diff(old, new):
+    """Список изменений (индекс, старая запись, новая запись); None - записи нет"""
+    changes = []
+    for i in range(max(len(old), len(new))):
+        old_package = old[i] if i < len(old) else None
+        new_package = new[i] if i < len(new) else None
+        if old_package is not new_package:
+            changes.append((i, old_package, new_package))
+    return changes
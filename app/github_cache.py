@@ -0,0 +1,248 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# TTL (в секундах) для разных эндпоинтов GitHub API; проверяются по порядку
+DEFAULT_TTLS = [
+    (re.compile(r"/repos/[^/]+/[^/]+/releases"), 10 * 60),
+    (re.compile(r"/repos/[^/]+/[^/]+/topics"), 60 * 60),
+    (re.compile(r"/repos/[^/]+/[^/]+/issues"), 5 * 60),
+    (re.compile(r"/repos/[^/]+/[^/]+/?(\?|$)"), 10 * 60),
+    (re.compile(r"/users/[^/?]+/?(\?|$)"), 60 * 60),
+    (re.compile(r"/user/(orgs|repos)"), 2 * 60),
+    (re.compile(r"/orgs/[^/]+/repos"), 2 * 60),
+]
+DEFAULT_TTL = 5 * 60
+
+# Заголовки ответа, которые нужно сохранять вместе с телом
+KEPT_HEADERS = ("etag", "last-modified", "link", "content-type")
+
+# Статусы, которые имеет смысл кешировать (404 - например, у репозитория нет релизов)
+CACHEABLE_STATUSES = (200, 404)
+
+
+class CachedResponse:
+    """Ответ из кеша с тем же интерфейсом, что используют вызывающие (requests/httpx)"""
+
+    def __init__(self, status_code, headers, text, from_cache=False):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.from_cache = from_cache
+
+    def json(self):
+        return json.loads(self.text) if self.text else None
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"HTTP {self.status_code}")
+
+
+class MemoryBackend:
+    """Кеш в памяти процесса с вытеснением по LRU"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Кеш в локальном SQLite-файле, общий для всех воркеров на машине"""
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache ("
+            "key TEXT PRIMARY KEY, entry TEXT NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS http_cache_accessed ON http_cache (accessed_at)")
+        conn.commit()
+
+    # sqlite3-соединение нельзя делить между потоками, поэтому держим своё на каждый поток
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT entry FROM http_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE http_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key, entry):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO http_cache (key, entry, accessed_at) VALUES (?, ?, ?)",
+            (key, json.dumps(entry), time.time()),
+        )
+        count = conn.execute("SELECT COUNT(*) FROM http_cache").fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM http_cache WHERE key IN "
+                "(SELECT key FROM http_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        conn.commit()
+
+    def delete(self, key):
+        conn = self._conn()
+        conn.execute("DELETE FROM http_cache WHERE key = ?", (key,))
+        conn.commit()
+
+    def delete_prefix(self, prefix):
+        conn = self._conn()
+        conn.execute("DELETE FROM http_cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+        conn.commit()
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM http_cache")
+        conn.commit()
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM http_cache").fetchone()[0]
+
+
+class GitHubCache:
+    """Кеш ответов GitHub API с TTL и условными запросами по ETag.
+
+    Ключ - URL плюс хеш заголовка Authorization, чтобы ответы разных
+    пользователей не смешивались. Пока запись свежая, она отдаётся без
+    запроса; после истечения TTL уходит запрос с If-None-Match, и ответ
+    304 (который GitHub не учитывает в лимите) просто продлевает запись.
+    """
+
+    def __init__(self, backend=None, ttls=None, default_ttl=DEFAULT_TTL):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttls = ttls if ttls is not None else DEFAULT_TTLS
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def ttl_for(self, url):
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def key_for(self, url, headers=None):
+        auth = (headers or {}).get("Authorization")
+        identity = hashlib.sha256(auth.encode()).hexdigest()[:16] if auth else "anon"
+        return f"{identity}:{url}"
+
+    def stats(self):
+        total = self.hits + self.misses + self.not_modified
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_ratio": (self.hits + self.not_modified) / total if total else 0.0,
+            "entries": len(self.backend),
+        }
+
+    def invalidate(self, url, headers=None):
+        self.backend.delete(self.key_for(url, headers))
+
+    def invalidate_prefix(self, url_prefix, headers=None):
+        """Удаляет все ответы, URL которых начинается с url_prefix (например, все страницы списка)"""
+        self.backend.delete_prefix(self.key_for(url_prefix, headers))
+
+    def _lookup(self, url, headers):
+        key = self.key_for(url, headers)
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry["stored_at"] < self.ttl_for(url):
+            self.hits += 1
+            return key, entry, None
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry["headers"].get("etag"):
+                request_headers["If-None-Match"] = entry["headers"]["etag"]
+            if entry["headers"].get("last-modified"):
+                request_headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+        return key, entry, request_headers
+
+    def _store(self, key, entry, response):
+        if response.status_code == 304 and entry is not None:
+            self.not_modified += 1
+            entry["stored_at"] = time.time()
+            self.backend.set(key, entry)
+            return _to_response(entry, from_cache=True)
+
+        self.misses += 1
+        text = response.text
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        if response.status_code in CACHEABLE_STATUSES:
+            self.backend.set(key, {
+                "status": response.status_code,
+                "headers": headers,
+                "body": text,
+                "stored_at": time.time(),
+            })
+        return CachedResponse(response.status_code, headers, text)
+
+    async def aget(self, url, headers, fetch):
+        """GET через кеш; fetch(url, headers) - корутина, выполняющая реальный запрос"""
+        key, entry, request_headers = self._lookup(url, headers)
+        if request_headers is None:
+            return _to_response(entry, from_cache=True)
+        return self._store(key, entry, await fetch(url, request_headers))
+
+
+def _to_response(entry, from_cache=False):
+    return CachedResponse(entry["status"], entry["headers"], entry["body"], from_cache=from_cache)
+
+
+def create_cache(backend="memory", path="github_cache.sqlite3", max_entries=2048):
+    """Создаёт кеш с нужным хранилищем: "memory" или "sqlite" """
+    if backend == "sqlite":
+        return GitHubCache(SQLiteBackend(path, max_entries=max_entries))
+    return GitHubCache(MemoryBackend(max_entries=max_entries))
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import re
+import time
+from urllib.parse import urlparse
+
+from metrics import metrics, timed
+
+NEXT_LINK_RE = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+# Имена владельцев, репозиториев и номера в пути заменяются шаблонами,
+# чтобы метрики собирались по эндпоинтам, а не по отдельным URL
+ENDPOINT_PATTERNS = [
+    (re.compile(r"^/repos/[^/]+/[^/]+"), "/repos/:owner/:repo"),
+    (re.compile(r"^/(users|orgs)/[^/]+"), r"/\1/:name"),
+    (re.compile(r"/(issues|releases|pulls)/\d+"), r"/\1/:number"),
+    (re.compile(r"/releases/tags/[^/]+"), "/releases/tags/:tag"),
+]
+
+
+def next_page_url(link_header):
+    """URL следующей страницы из заголовка Link (или None)"""
+    match = NEXT_LINK_RE.search(link_header or "")
+    return match.group(1) if match else None
+
+
+def _token_id(authorization):
+    """Отпечаток токена из "token X", "bearer X" или самого токена; None - без токена"""
+    if not authorization:
+        return None
+    token = authorization.split()[-1]
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def _default_resource(url):
+    # Если GitHub не прислал X-RateLimit-Resource, пул определяется по эндпоинту
+    return "graphql" if urlparse(url).path.rstrip("/").endswith("/graphql") else "core"
+
+
+def endpoint_name(url):
+    """Эндпоинт GitHub для метрик: /repos/:owner/:repo/releases и т.п."""
+    path = urlparse(url).path.rstrip("/") or "/"
+    for pattern, replacement in ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path)
+    return path
+
+
+class GitHubClient:
+    """Общий на всё приложение асинхронный клиент GitHub.
+
+    Держит один httpx.AsyncClient с пулом соединений и keep-alive,
+    ограничивает число одновременных запросов семафором и пропускает
+    GET-запросы через кеш ответов (если он задан).
+
+    Лимиты запросов GitHub считаются отдельно для каждого токена и
+    ресурса (core - REST, graphql - GraphQL), поэтому X-RateLimit-*
+    хранятся по паре (токен, X-RateLimit-Resource): запросы с токенами
+    пользователей не влияют на лимит токена приложения.
+    """
+
+    def __init__(self, cache=None, max_connections=20, max_keepalive=10,
+                 max_concurrency=10, timeout=10.0):
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self._max_connections = max_connections
+        self._max_keepalive = max_keepalive
+        self._timeout = timeout
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+        # (токен, ресурс) -> последние известные (X-RateLimit-Remaining, X-RateLimit-Reset)
+        self._rate_limits = {}
+
+    # Клиент и семафор привязаны к event loop, поэтому создаём их лениво в текущем цикле.
+    # httpx импортируется здесь же: на холодном старте он не нужен до первого запроса к GitHub
+    def _ensure_client(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            import httpx
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self._max_connections,
+                    max_keepalive_connections=self._max_keepalive,
+                ),
+                timeout=httpx.Timeout(self._timeout, connect=5.0),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    async def _request(self, method, url, **kwargs):
+        client = self._ensure_client()
+        endpoint = endpoint_name(url)
+        status = "error"
+        try:
+            with timed(f"github {endpoint}", metric="github_request_duration_seconds", endpoint=endpoint):
+                async with self._semaphore:
+                    response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        finally:
+            metrics.inc("github_requests_total", "GitHub API calls by endpoint and status",
+                        endpoint=endpoint, status=status)
+        self._track_rate_limit(response)
+        return response
+
+    async def _fetch(self, url, headers):
+        return await self._request("GET", url, headers=headers)
+
+    def _track_rate_limit(self, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        request = response.request
+        resource = response.headers.get("X-RateLimit-Resource") or _default_resource(str(request.url))
+        key = (_token_id(request.headers.get("Authorization")), resource)
+        self._rate_limits[key] = (int(remaining), int(reset))
+
+    def rate_limit(self, token=None, resource="core"):
+        """(остаток, время сброса) лимита токена в пуле resource; (None, None) - ответов ещё не было"""
+        return self._rate_limits.get((_token_id(token), resource), (None, None))
+
+    def rate_limit_wait(self, reserve=0, token=None, resource="core"):
+        """Сколько секунд нужно подождать, чтобы запросы с токеном не вышли за лимит пула resource"""
+        remaining, reset = self.rate_limit(token, resource)
+        if remaining is None or remaining > reserve:
+            return 0
+        return max(0, reset - time.time() + 1)
+
+    async def get(self, url, headers=None):
+        """GET-запрос к GitHub (через кеш, если он есть)"""
+        headers = headers or {}
+        if self.cache is None:
+            return await self._fetch(url, headers)
+        return await self.cache.aget(url, headers, self._fetch)
+
+    async def get_all(self, url, headers=None, max_pages=50):
+        """Собирает все страницы списка, переходя по ссылкам rel="next" из заголовка Link"""
+        items = []
+        for _ in range(max_pages):
+            response = await self.get(url, headers)
+            if response.status_code != 200:
+                break
+            items.extend(response.json())
+            url = next_page_url(response.headers.get("link"))
+            if not url:
+                break
+        return items
+
+    async def post(self, url, data=None, json=None, headers=None):
+        """POST-запрос без кеширования (обмен OAuth-кода на токен, GraphQL)"""
+        return await self._request("POST", url, data=data, json=json, headers=headers or {})
+
+    async def download(self, url, write, max_bytes=None):
+        """Скачивает файл (например, ассет релиза) потоком, передавая куски в корутину write(chunk).
+
+        Редиректы на CDN GitHub выполняются автоматически; семафор не
+        занимается, чтобы долгие загрузки не задерживали запросы к API.
+        Возвращает размер файла; больше max_bytes - ValueError.
+        """
+        client = self._ensure_client()
+        size = 0
+        async with client.stream("GET", url, follow_redirects=True) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f"{url} is larger than {max_bytes} bytes")
+                await write(chunk)
+        return size
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
@@ -0,0 +1,148 @@
+REPOSITORY_FIELDS = """
+    name
+    description
+    stargazerCount
+    forkCount
+    createdAt
+    updatedAt
+    primaryLanguage { name }
+    issues(states: OPEN) { totalCount }
+    pullRequests(states: OPEN) { totalCount }
+    owner {
+      login
+      avatarUrl
+      ... on User { name bio }
+      ... on Organization { name description }
+    }
+    latestRelease {
+      tagName
+      publishedAt
+      description
+      releaseAssets(first: 50) { nodes { name downloadUrl } }
+    }
+    releases(first: 10, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes {
+        tagName
+        publishedAt
+        isDraft
+        isPrerelease
+        releaseAssets(first: 50) { nodes { name downloadUrl } }
+      }
+    }
+    repositoryTopics(first: 50) { nodes { topic { name } } }
+"""
+
+
+def build_query(repos):
+    """Строит один GraphQL-запрос с алиасом r{i} на каждый репозиторий"""
+    params = []
+    fields = []
+    variables = {}
+    for i, (owner, name) in enumerate(repos):
+        params.append(f"$o{i}: String!, $n{i}: String!")
+        fields.append(f"  r{i}: repository(owner: $o{i}, name: $n{i}) {{{REPOSITORY_FIELDS}  }}")
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = name
+    query = "query(" + ", ".join(params) + ") {\n" + "\n".join(fields) + "\n}"
+    return query, variables
+
+
+def _release_to_rest(release):
+    return {
+        "tag_name": release.get("tagName", ""),
+        "published_at": release.get("publishedAt", ""),
+        "body": release.get("description", ""),
+        "draft": release.get("isDraft", False),
+        "prerelease": release.get("isPrerelease", False),
+        "assets": [
+            {"name": asset["name"], "browser_download_url": asset["downloadUrl"]}
+            for asset in (release.get("releaseAssets") or {}).get("nodes", [])
+        ],
+    }
+
+
+def to_rest_shape(node):
+    """Переводит ответ GraphQL в структуры REST API: (repo, release, user, topics, releases)"""
+    owner = node.get("owner") or {}
+    data = {
+        "name": node.get("name"),
+        "description": node.get("description"),
+        "stargazers_count": node.get("stargazerCount", 0),
+        "forks_count": node.get("forkCount", 0),
+        # В REST watchers_count - устаревший синоним stargazers_count; watchers в GraphQL - это подписчики
+        "watchers_count": node.get("stargazerCount", 0),
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        # В REST open_issues_count учитывает и открытые pull request'ы
+        "open_issues_count": (node.get("issues") or {}).get("totalCount", 0)
+                             + (node.get("pullRequests") or {}).get("totalCount", 0),
+        "created_at": node.get("createdAt", ""),
+        "updated_at": node.get("updatedAt", ""),
+        "owner": {"login": owner.get("login"), "avatar_url": owner.get("avatarUrl", "")},
+    }
+
+    release = node.get("latestRelease")
+    release_data = _release_to_rest(release) if release else {}
+    # Последние релизы для истории версий (старые уже сохранены в записи пакета)
+    releases_data = [_release_to_rest(r) for r in (node.get("releases") or {}).get("nodes", []) if r]
+
+    user_data = {
+        "avatar_url": owner.get("avatarUrl", ""),
+        "name": owner.get("name") or "",
+        "bio": owner.get("bio") or owner.get("description") or "",
+    }
+
+    topics = [
+        topic_node["topic"]["name"]
+        for topic_node in (node.get("repositoryTopics") or {}).get("nodes", [])
+    ]
+    return data, release_data, user_data, topics, releases_data
+
+
+class GraphQLFetcher:
+    """Пакетная загрузка метаданных репозиториев через GitHub GraphQL API.
+
+    Вместо четырёх REST-запросов на репозиторий делает один запрос на
+    batch_size репозиториев. Адрес API настраивается, поэтому загрузчик
+    можно прогонять против локального фейкового сервера.
+    """
+
+    def __init__(self, github, url="https://api.github.com/graphql", token=None, batch_size=50):
+        self.github = github
+        self.url = url
+        self.token = token
+        self.batch_size = batch_size
+
+    @property
+    def available(self):
+        # GraphQL API GitHub не работает без токена
+        return bool(self.token)
+
+    async def _fetch_batch(self, repos):
+        query, variables = build_query(repos)
+        headers = {"Authorization": f"bearer {self.token}", "Accept": "application/json"}
+        response = await self.github.post(self.url, json={"query": query, "variables": variables},
+                                          headers=headers)
+        response.raise_for_status()
+        payload = response.json()
+        for error in payload.get("errors") or []:
+            # NOT_FOUND и подобные ошибки относятся к отдельным алиасам, остальные данные валидны
+            print(f"GraphQL error: {error.get('message')}")
+        data = payload.get("data") or {}
+
+        results = []
+        for i in range(len(repos)):
+            node = data.get(f"r{i}")
+            results.append(to_rest_shape(node) if node else None)
+        return results
+
+    async def fetch_many(self, repos):
+        """Возвращает для каждого (owner, name) кортеж (repo, release, user, topics, releases) или None"""
+        results = []
+        for start in range(0, len(repos), self.batch_size):
+            batch = repos[start:start + self.batch_size]
+            try:
+                results.extend(await self._fetch_batch(batch))
+            except Exception as e:
+                print(f"Error fetching GraphQL batch: {e}")
+                results.extend([None] * len(batch))
+        return results
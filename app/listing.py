@@ -0,0 +1,104 @@
+import threading
+from datetime import datetime
+
+# Поля пакета, которые API отдаёт по умолчанию (компактная проекция)
+DEFAULT_API_FIELDS = ("id", "name", "description", "version", "stars", "owner", "download_url", "download_sha256", "updated_at")
+
+
+def parse_date(value):
+    """Разбирает дату из записи пакета ("03 Mar 2025" или ISO) для сортировки"""
+    if not value or value == "N/A":
+        return datetime.min
+    for fmt in ("%d %b %Y", "%Y-%m-%dT%H:%M:%SZ"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return datetime.min
+
+
+# Порядки сортировки: ключ и флаг "по убыванию"
+SORT_ORDERS = {
+    "stars": (lambda p: p.get("stars") or 0, True),
+    "updated": (lambda p: parse_date(p.get("updated_at")), True),
+    "name": (lambda p: (p.get("name") or "").casefold(), False),
+}
+# "newest" - недавно добавленные в каталог, "default" - порядок каталога
+SORT_NAMES = ("default", "stars", "updated", "name", "newest")
+
+
+class SortedViews:
+    """Кеш отсортированных списков id пакетов.
+
+    Сортировка всего каталога выполняется один раз на версию каталога,
+    а не на каждый запрос; при изменении каталога кеш сбрасывается.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._generation = 0
+
+    def rebuild(self, packages):
+        with self._lock:
+            self._orders = {}
+            self._generation += 1
+
+    def apply_changes(self, changes):
+        with self._lock:
+            self._orders = {}
+            self._generation += 1
+
+    def snapshot_state(self):
+        with self._lock:
+            return dict(self._orders)
+
+    def restore_state(self, state):
+        with self._lock:
+            self._orders = dict(state)
+            self._generation += 1
+
+    def sort_ids(self, packages, ids, sort):
+        """Сортирует произвольный набор id (например, результаты поиска)"""
+        if sort == "newest":
+            return sorted(ids, reverse=True)
+        if sort not in SORT_ORDERS:
+            return list(ids)
+        key, reverse = SORT_ORDERS[sort]
+        # Для равных значений сохраняем порядок каталога
+        if reverse:
+            return sorted(ids, key=lambda i: (key(packages[i]), -i), reverse=True)
+        return sorted(ids, key=lambda i: (key(packages[i]), i))
+
+    def order(self, packages, sort):
+        """id всех пакетов каталога в нужном порядке"""
+        with self._lock:
+            ids = self._orders.get(sort)
+            generation = self._generation
+        if ids is None:
+            ids = self.sort_ids(packages, range(len(packages)), sort)
+            with self._lock:
+                # Не кешируем результат, если каталог успел измениться во время сортировки
+                if generation == self._generation:
+                    self._orders[sort] = ids
+        return ids
+
+
+def paginate(ids, offset, limit):
+    """Срез списка id и смещение следующей страницы (None, если страниц больше нет)"""
+    page = ids[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(ids) else None
+    return page, next_offset
+
+
+def project(package_id, package, fields=DEFAULT_API_FIELDS):
+    """Оставляет в записи пакета только запрошенные поля"""
+    item = {}
+    for field in fields:
+        if field == "id":
+            item["id"] = package_id
+        elif field == "owner":
+            item["owner"] = (package.get("owner") or {}).get("login")
+        elif field in package:
+            item[field] = package[field]
+    return item
@@ -1,15 +1,37 @@
 from fastapi import FastAPI, Request, Form, HTTPException, Depends, Cookie
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-import httpx
+import asyncio
+import hashlib
+import hmac
 import json
 import os
-import requests
 from typing import List, Optional
-from jose import jwt
 from datetime import datetime, timedelta
 import secrets
+import time
+from urllib.parse import urlparse
+
+from artifacts import ArtifactStore, metadata_response
+from assets import AssetFiles, AssetManifest
+from bulk_import import BulkImportJob
+from bulk_refresh import BulkRefreshJob
+from aggregates import CatalogAggregates
+from catalog import CatalogStore, canonical_github_url
+from github_cache import create_cache
+from github_client import GitHubClient, next_page_url
+from github_graphql import GraphQLFetcher
+from package_index import PackageIndex
+from page_cache import PageCache
+from metrics import MetricsMiddleware, metrics, timed
+from listing import DEFAULT_API_FIELDS, SORT_NAMES, SortedViews, paginate, parse_date, project
+from refresh import RefreshScheduler, is_stale
+from search import SearchIndex
+from sessions import VerifiedTokenCache, create_session_store
+from startup import TemplateBytecodeCache
+from storage import DuplicatePackageError, create_storage
+from trends import TRENDING_WINDOWS, TrendStore
+from ttl_cache import TTLCache
 
 app = FastAPI(title="Ryton Store")
 
@@ -17,13 +39,12 @@ app = FastAPI(title="Ryton Store")
 from mangum import Mangum
 handler = Mangum(app)
 
-# Настройки OAuth
-from dotenv import load_dotenv
-
 # Загружаем переменные из .env.local только в локальной среде
 if os.path.exists(".env.local"):
+    from dotenv import load_dotenv
     load_dotenv(".env.local")
 
+# Настройки OAuth
 GITHUB_CLIENT_ID = os.environ.get("GITHUB_CLIENT_ID")
 GITHUB_CLIENT_SECRET = os.environ.get("GITHUB_CLIENT_SECRET")
 
@@ -34,70 +55,327 @@ SECRET_KEY = os.environ.get("SECRET_KEY", secrets.token_hex(32))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 день
 
-# Подключаем статические файлы и шаблоны
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# Где хранить сессию: "jwt" (всё в cookie), "memory" или "sqlite" (в cookie только id сессии)
+SESSION_STORE = os.environ.get("SESSION_STORE", "jwt")
+SESSION_STORE_PATH = os.environ.get("SESSION_STORE_PATH", "sessions.sqlite3")
+
+# Хранилище каталога: "json" (packages.json) или "sqlite" (импорт: python storage.py import ...)
+CATALOG_BACKEND = os.environ.get("CATALOG_BACKEND", "json")
+CATALOG_PATH = os.environ.get("CATALOG_PATH", "catalog.sqlite3" if CATALOG_BACKEND == "sqlite" else "packages.json")
+# Старые числовые ссылки /package/<номер> -> постоянный id пакета
+CATALOG_REDIRECTS_PATH = os.environ.get("CATALOG_REDIRECTS_PATH", "redirects.json")
+
+# Сколько отрендеренных страниц держать в кеше для анонимных посетителей (0 - выключить)
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("PAGE_CACHE_MAX_ENTRIES", 512))
+
+# Размер страницы каталога по умолчанию и максимальный
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 24))
+MAX_PAGE_SIZE = 100
+
+# Сколько самых активных авторов показывать на странице категорий
+CATEGORY_OWNERS = int(os.environ.get("CATEGORY_OWNERS", 30))
+
+# Через сколько секунд данные пакета считаются устаревшими и обновляются в фоне
+PACKAGE_REFRESH_TTL = int(os.environ.get("PACKAGE_REFRESH_TTL", 60 * 60))
+
+# Отзывы кешируются отдельно от пакетов, со своим временем жизни
+REVIEWS_CACHE_TTL = int(os.environ.get("REVIEWS_CACHE_TTL", 10 * 60))
+REVIEWS_PAGE_SIZE = 10
+
+# История релизов: размер страницы списка релизов, сколько страниц читать за раз и сколько версий хранить
+RELEASES_PAGE_SIZE = 30
+RELEASE_HISTORY_MAX_PAGES = int(os.environ.get("RELEASE_HISTORY_MAX_PAGES", 5))
+RELEASE_HISTORY_LIMIT = int(os.environ.get("RELEASE_HISTORY_LIMIT", 100))
+
+# Организации и репозитории пользователя кешируются ненадолго (сбрасываются при выходе)
+USER_GITHUB_CACHE_TTL = int(os.environ.get("USER_GITHUB_CACHE_TTL", 2 * 60))
+
+# Кеш ответов GitHub API: "memory" (в процессе) или "sqlite" (общий файл для воркеров)
+GITHUB_CACHE_BACKEND = os.environ.get("GITHUB_CACHE_BACKEND", "memory")
+GITHUB_CACHE_PATH = os.environ.get("GITHUB_CACHE_PATH", "github_cache.sqlite3")
+GITHUB_CACHE_MAX_ENTRIES = int(os.environ.get("GITHUB_CACHE_MAX_ENTRIES", 2048))
+
+# Пул соединений к GitHub и ограничение на число одновременных запросов
+GITHUB_MAX_CONNECTIONS = int(os.environ.get("GITHUB_MAX_CONNECTIONS", 20))
+GITHUB_MAX_CONCURRENCY = int(os.environ.get("GITHUB_MAX_CONCURRENCY", 10))
+GITHUB_TIMEOUT = float(os.environ.get("GITHUB_TIMEOUT", 10))
+
+# Адрес GitHub REST API (для бенчмарков - локальный фейковый сервер, см. bench/fake_github.py)
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+# Способ загрузки метаданных при массовом обновлении: "rest" или "graphql" (пачками, нужен GITHUB_TOKEN)
+GITHUB_FETCH_BACKEND = os.environ.get("GITHUB_FETCH_BACKEND", "rest")
+GITHUB_GRAPHQL_URL = os.environ.get("GITHUB_GRAPHQL_URL", f"{GITHUB_API_URL}/graphql")
+GITHUB_GRAPHQL_BATCH_SIZE = int(os.environ.get("GITHUB_GRAPHQL_BATCH_SIZE", 50))
+
+# Зеркало .ryx-файлов релизов ("" - отдавать ссылки на GitHub напрямую)
+ARTIFACT_DIR = os.environ.get("ARTIFACT_DIR", "artifacts")
+ARTIFACT_MAX_BYTES = int(os.environ.get("ARTIFACT_MAX_BYTES", 100 * 1024 * 1024))
+
+# Секрет вебхука GitHub (/webhooks/github); с вебхуками PACKAGE_REFRESH_TTL можно сильно увеличить
+GITHUB_WEBHOOK_SECRET = os.environ.get("GITHUB_WEBHOOK_SECRET")
+
+# Массовый импорт (/api/packages/import): максимум репозиториев за раз и сколько хранить прогресс
+BULK_IMPORT_MAX_REPOS = int(os.environ.get("BULK_IMPORT_MAX_REPOS", 200))
+BULK_IMPORT_JOB_TTL = int(os.environ.get("BULK_IMPORT_JOB_TTL", 60 * 60))
+
+# Фоновое обновление всего каталога
+BULK_REFRESH_CONCURRENCY = int(os.environ.get("BULK_REFRESH_CONCURRENCY", 5))
+BULK_REFRESH_STATE_PATH = os.environ.get("BULK_REFRESH_STATE_PATH", "bulk_refresh_state.json")
+
+# Ряды звёзд/скачиваний пакетов ("" - не сохранять) и как часто пересчитывать рейтинг /trending
+TRENDS_PATH = os.environ.get("TRENDS_PATH", "trends.pickle")
+TRENDING_INTERVAL = int(os.environ.get("TRENDING_INTERVAL", 15 * 60))
+
+# Артефакты сборки для холодного старта (python startup.py): снимок каталога
+# с готовыми индексами и байткод шаблонов; пустое значение отключает
+CATALOG_SNAPSHOT = os.environ.get("CATALOG_SNAPSHOT", "catalog.snapshot")
+TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR", "template_cache")
+
+# Заголовок Server-Timing для запросов с X-Server-Timing: 1 (раскрывает внутренние задержки)
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "").lower() in ("1", "true", "yes")
+
+# Задержки маршрутов, каталога, GitHub и шаблонов (/metrics)
+app.add_middleware(MetricsMiddleware, server_timing=SERVER_TIMING)
+
+class InstrumentedTemplates(Jinja2Templates):
+    def TemplateResponse(self, name, *args, **kwargs):
+        with timed(f"render {name}"):
+            return super().TemplateResponse(name, *args, **kwargs)
+
+# Подключаем статические файлы и шаблоны; собранная статика (python assets.py)
+# отдаётся из static/dist/ с долгим кешированием и готовыми .br/.gz
+assets = AssetManifest("static")
+app.mount("/static", AssetFiles(directory="static", manifest=assets), name="static")
+templates = InstrumentedTemplates(
+    directory="templates",
+    bytecode_cache=TemplateBytecodeCache(TEMPLATE_CACHE_DIR) if TEMPLATE_CACHE_DIR else None,
+)
+templates.env.globals["asset_url"] = assets.url
+
+# Каталог пакетов: загружается один раз при старте и обслуживается из памяти
+catalog = CatalogStore(create_storage(CATALOG_BACKEND, CATALOG_PATH), redirects_path=CATALOG_REDIRECTS_PATH)
+if not (CATALOG_SNAPSHOT and catalog.load_snapshot(CATALOG_SNAPSHOT)):
+    catalog.load()
 
 # Загружаем список пакетов
 def load_packages():
-    if os.path.exists("packages.json"):
-        with open("packages.json", "r") as f:
-            return json.load(f)
-    return []
+    return catalog.all()
 
 # Сохраняем список пакетов
 def save_packages(packages):
-    with open("packages.json", "w") as f:
-        json.dump(packages, f, indent=2)
+    catalog.save(packages)
+
+refresher = RefreshScheduler()
+
+reviews_cache = TTLCache(REVIEWS_CACHE_TTL, max_entries=2048)
+
+# Ключи - (login пользователя, "orgs" | "repos")
+user_github_cache = TTLCache(USER_GITHUB_CACHE_TTL, max_entries=1024)
+
+# Задачи массового импорта по id
+import_jobs = TTLCache(BULK_IMPORT_JOB_TTL, max_entries=256)
+
+# Поисковый индекс обновляется вместе с каталогом
+search_index = SearchIndex()
+catalog.subscribe(search_index)
+
+# Счётчики тегов/языков/владельцев и индекс тег -> пакеты
+aggregates = CatalogAggregates()
+catalog.subscribe(aggregates)
+
+# Индекс для менеджера пакетов (/index/v1/...)
+package_index = PackageIndex()
+catalog.subscribe(package_index)
+
+# Кеш готовых страниц для анонимных посетителей (сбрасывается сменой версии каталога)
+page_cache = PageCache(max_entries=PAGE_CACHE_MAX_ENTRIES)
+
+def cached_page(request, user, render):
+    """Отдаёт страницу из кеша для анонимных посетителей; render() рендерит её при промахе"""
+    if user is not None or PAGE_CACHE_MAX_ENTRIES <= 0:
+        return render()
+    
+    load_packages()  # подтягиваем изменения других воркеров до чтения версии
+    key = page_cache.key(request, catalog.version)
+    entry = page_cache.get(key)
+    if entry is None:
+        response = render()
+        if response.status_code != 200:
+            return response
+        entry = page_cache.put(key, response.body, response.media_type)
+    return page_cache.respond(entry, request)
+
+# Отсортированные представления каталога (пересчитываются при изменениях)
+sorted_views = SortedViews()
+catalog.subscribe(sorted_views)
+
+# Ряды звёзд и скачиваний для рейтинга "в тренде" (точка добавляется при изменении пакета)
+trends = TrendStore(TRENDS_PATH or None)
+catalog.subscribe(trends)
+
+def query_packages(q=None, tag=None, language=None, sort=None):
+    """Возвращает каталог и id подходящих пакетов в нужном порядке"""
+    packages = load_packages()
+    if sort not in SORT_NAMES:
+        sort = None
+    
+    if tag and not q and not language:
+        # Только тег: берём готовый индекс тег -> пакеты вместо поиска
+        package_ids = aggregates.ids_for_tag(tag)
+        if sort:
+            package_ids = sorted_views.sort_ids(packages, package_ids, sort)
+    elif q or tag or language:
+        package_ids = search_index.search(q, topic=tag, language=language)
+        if sort:
+            package_ids = sorted_views.sort_ids(packages, package_ids, sort)
+    else:
+        package_ids = sorted_views.order(packages, sort or "default")
+    
+    return packages, [i for i in package_ids if i < len(packages)]
+
+github_cache = create_cache(GITHUB_CACHE_BACKEND, GITHUB_CACHE_PATH, GITHUB_CACHE_MAX_ENTRIES)
+
+# Один асинхронный клиент GitHub на всё время жизни приложения;
+# GET-запросы идут через кеш с TTL и условными запросами по ETag
+github = GitHubClient(
+    cache=github_cache,
+    max_connections=GITHUB_MAX_CONNECTIONS,
+    max_concurrency=GITHUB_MAX_CONCURRENCY,
+    timeout=GITHUB_TIMEOUT,
+)
+
+github_graphql = GraphQLFetcher(
+    github,
+    url=GITHUB_GRAPHQL_URL,
+    token=os.environ.get("GITHUB_TOKEN"),
+    batch_size=GITHUB_GRAPHQL_BATCH_SIZE,
+)
+
+# Скачанные релизы хранятся по SHA-256 содержимого; хеш записывается в пакет
+artifacts = ArtifactStore(ARTIFACT_DIR, max_bytes=ARTIFACT_MAX_BYTES) if ARTIFACT_DIR else None
+
+def use_graphql():
+    return GITHUB_FETCH_BACKEND == "graphql" and github_graphql.available
+
+bulk_refresh = BulkRefreshJob(
+    catalog,
+    lambda packages: update_packages_from_github(packages),
+    github,
+    state_path=BULK_REFRESH_STATE_PATH,
+    concurrency=BULK_REFRESH_CONCURRENCY,
+    batch_size=GITHUB_GRAPHQL_BATCH_SIZE if use_graphql() else 1,
+    requests_per_batch=1 if use_graphql() else 4,
+    # Темп задают лимиты токена приложения в том пуле, который расходует загрузка
+    rate_limit_token=os.environ.get("GITHUB_TOKEN"),
+    rate_limit_resource="graphql" if use_graphql() else "core",
+)
+
+@app.on_event("shutdown")
+async def close_github_client():
+    await github.aclose()
+
+@app.on_event("shutdown")
+async def save_trends():
+    # Скачивания, учтённые после последнего пересчёта рейтинга, иначе потеряются
+    try:
+        await asyncio.to_thread(trends.save)
+    except Exception as e:
+        print(f"Error saving trends: {e}")
+
+async def refresh_package(github_url):
+    """Обновляет пакет из GitHub и записывает результат в каталог"""
+    index = catalog.find(github_url)
+    if index is None:
+        return
+    package = catalog.get(index)
+    
+    updated_package = await update_package_from_github(package)
+    if updated_package is package:
+        return
+    
+    # Запись ищется заново под блокировкой: за время запроса к GitHub её позиция могла измениться
+    catalog.replace(github_url, lambda current: updated_package)
+
+def resolve_package(request, package_id):
+    """Пакет по id; для старой числовой ссылки - (None, редирект на адрес с новым id)"""
+    package = catalog.get_by_id(package_id)
+    if package is not None:
+        return package, None
+    
+    new_id = catalog.resolve_legacy_id(package_id) if package_id.isdigit() else None
+    if new_id is None:
+        raise HTTPException(status_code=404, detail="Package not found")
+    segments = [new_id if segment == package_id else segment for segment in request.url.path.split("/")]
+    return None, RedirectResponse(url=str(request.url.replace(path="/".join(segments))), status_code=301)
+
+# Серверные сессии (None - данные сессии хранятся в JWT в cookie)
+session_store = create_session_store(SESSION_STORE, SESSION_STORE_PATH)
+
+# Недавно проверенные JWT, чтобы не проверять подпись на каждый запрос
+verified_tokens = VerifiedTokenCache(max_entries=1024)
 
 # Функция для получения текущего пользователя
 async def get_current_user(session: Optional[str] = Cookie(None)):
     if not session:
         return None
     
+    if session_store is not None:
+        return session_store.get(session)
+    
+    payload = verified_tokens.get(session)
+    if payload is not None:
+        return payload
+    
+    # python-jose нужен только посетителям с cookie сессии
+    from jose import jwt
     try:
         payload = jwt.decode(session, SECRET_KEY, algorithms=[ALGORITHM])
+        verified_tokens.put(session, payload)
         return payload
     except:
         return None
 
 @app.get("/update-package/{package_id}")
-async def update_package(package_id: int, user: dict = Depends(get_current_user)):
+async def update_package(request: Request, package_id: str, user: dict = Depends(get_current_user)):
     if not user:
         return RedirectResponse(url="/login/github")
     
-    packages = load_packages()
-    
-    if package_id < 0 or package_id >= len(packages):
-        raise HTTPException(status_code=404, detail="Package not found")
-    
-    package = packages[package_id]
+    package, redirect = resolve_package(request, package_id)
+    if redirect is not None:
+        return redirect
     
     # Проверяем, принадлежит ли пакет пользователю
     if package.get("owner", {}).get("login") != user["login"] and package.get("submitted_by") != user["login"]:
         raise HTTPException(status_code=403, detail="You don't have permission to update this package")
     
     # Обновляем данные пакета из GitHub
-    packages[package_id] = update_package_from_github(package)
-    save_packages(packages)
+    catalog.update(package_id, await update_package_from_github(package))
     
     return RedirectResponse(url="/my-packages")
 
-def get_github_reviews(repo_owner, repo_name, limit=10):
-    """Получает последние отзывы из GitHub Issues с меткой 'review'"""
-    # Формируем URL для API GitHub
-    issues_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/issues?labels=review&state=all&sort=created&direction=desc&per_page={limit}"
-    
-    # Добавляем токен GitHub, если он есть
+def github_app_headers():
+    """Заголовки запросов к GitHub от имени приложения (с GITHUB_TOKEN лимит запросов выше)"""
     headers = {}
     github_token = os.environ.get("GITHUB_TOKEN")
     if github_token:
         headers["Authorization"] = f"token {github_token}"
+    return headers
+
+async def get_github_reviews(repo_owner, repo_name, limit=10, page=1):
+    """Получает отзывы из GitHub Issues с меткой 'review': (отзывы, есть ли следующая страница)"""
+    cache_key = (repo_owner.lower(), repo_name.lower(), limit, page)
+    cached = reviews_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Формируем URL для API GitHub
+    issues_url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/issues?labels=review&state=all&sort=created&direction=desc&per_page={limit}&page={page}"
     
     try:
-        response = requests.get(issues_url, headers=headers)
+        response = await github.get(issues_url, github_app_headers())
         if response.status_code != 200:
-            return []
+            return [], False
         
         issues = response.json()
         reviews = []
@@ -124,21 +402,50 @@ def get_github_reviews(repo_owner, repo_name, limit=10):
             }
             reviews.append(review)
         
-        return reviews
+        # GitHub сообщает о следующей странице в заголовке Link
+        has_more = 'rel="next"' in response.headers.get("link", "")
+        reviews_cache.set(cache_key, (reviews, has_more))
+        return reviews, has_more
     except Exception as e:
         print(f"Error fetching reviews: {e}")
-        return []
+        return [], False
 
-def update_package_from_github(package):
+async def update_package_from_github(package):
     """Обновляет данные пакета из GitHub API"""
     if not package.get("github_url"):
         return package
     
-    # Получаем свежие данные из GitHub
-    repo_info = get_github_repo_info(package["github_url"])
+    # Получаем свежие данные из GitHub; релизы - только новее уже известных
+    repo_info = await get_github_repo_info(package["github_url"], known_versions(package))
+    return apply_repo_info(package, repo_info)
+
+def known_versions(package):
+    """Версии, которые уже есть в записи пакета (до них список релизов не листается)"""
+    versions = {release["version"] for release in package.get("releases") or []}
+    if package.get("version"):
+        versions.add(package["version"])
+    return versions
+
+async def update_packages_from_github(packages):
+    """Обновляет несколько пакетов (в режиме GraphQL - одним запросом на пачку); None - загрузка не удалась"""
+    if use_graphql():
+        repo_infos = await get_github_repo_info_batch([p.get("github_url", "") for p in packages])
+    else:
+        repo_infos = await asyncio.gather(*(get_github_repo_info(p["github_url"], known_versions(p))
+                                            for p in packages))
+    return [apply_repo_info(p, info) if info else None for p, info in zip(packages, repo_infos)]
+
+def apply_repo_info(package, repo_info):
+    """Переносит данные из get_github_repo_info в запись пакета"""
     if not repo_info:
         return package
     
+    # Работаем с копией: исходная запись может читаться из каталога в памяти
+    package = dict(package)
+    
+    # История релизов пополняется новыми версиями, известные не перезаписываются
+    package["releases"] = merge_releases(package.get("releases") or [], repo_info.get("releases") or [])
+    
     # Обновляем только те поля, которые должны парситься из GitHub
     package["owner"] = repo_info["owner"]
     package["stars"] = repo_info["stars"]
@@ -148,17 +455,36 @@ def update_package_from_github(package):
     package["open_issues"] = repo_info["open_issues"]
     package["created_at"] = repo_info["created_at"]
     package["updated_at"] = repo_info["updated_at"]
-    package["version"] = repo_info["release"].get("version", package.get("version", ""))
-    package["download_url"] = repo_info["release"].get("download_url", package.get("download_url", ""))
-    package["published_at"] = repo_info["release"].get("published_at", package.get("published_at", ""))
-    package["release_notes"] = repo_info["release"].get("body", package.get("release_notes", ""))
+    # Если на прочитанных страницах нет стабильного релиза, последний остаётся из истории
+    if repo_info["release"].get("version") or not package["releases"]:
+        apply_release_info(package, repo_info["release"])
+    package["refreshed_at"] = time.time()
     
     return package
 
-# Получаем информацию о репозитории с GitHub
-def get_github_repo_info(repo_url):
-    """Получает информацию о репозитории с GitHub"""
-    # Извлекаем имя пользователя и репозитория из URL
+def merge_releases(history, fetched):
+    """Добавляет в историю релизов (свежие сверху) версии, которых в ней ещё нет"""
+    known = {release["version"] for release in history}
+    added = [release for release in fetched if release["version"] not in known]
+    if not added:
+        return history
+    merged = sorted(added + list(history), key=lambda release: parse_date(release.get("published_at")), reverse=True)
+    return merged[:RELEASE_HISTORY_LIMIT]
+
+def apply_release_info(package, release):
+    """Переносит данные релиза (build_release_info) в копию записи пакета"""
+    package["version"] = release.get("version", package.get("version", ""))
+    download_url = release.get("download_url", package.get("download_url", ""))
+    if download_url != package.get("mirrored_from"):
+        # Хеш зеркала относится к прежнему файлу релиза
+        for field in ("download_sha256", "download_size", "mirrored_from"):
+            package.pop(field, None)
+    package["download_url"] = download_url
+    package["published_at"] = release.get("published_at", package.get("published_at", ""))
+    package["release_notes"] = release.get("body", package.get("release_notes", ""))
+
+# Извлекаем имя пользователя и репозитория из URL
+def parse_github_url(repo_url):
     parts = repo_url.strip("/").split("/")
     if "github.com" not in parts:
         return None
@@ -168,43 +494,83 @@ def get_github_repo_info(repo_url):
         return None
     
     username = parts[username_index]
-    repo_name = parts[username_index + 1] if username_index + 1 < len(parts) else None
+    repo_name = parts[username_index + 1].removesuffix(".git") if username_index + 1 < len(parts) else None
     
     if not repo_name:
         return None
     
+    return username, repo_name
+
+# Получаем информацию о репозитории с GitHub
+async def get_github_releases(username, repo_name, headers, known_versions=()):
+    """Релизы репозитория (свежие сверху) до первой уже известной версии.
+    
+    Если ничего не изменилось, это один условный запрос первой страницы (ответ 304).
+    """
+    url = f"{GITHUB_API_URL}/repos/{username}/{repo_name}/releases?per_page={RELEASES_PAGE_SIZE}"
+    releases = []
+    for _ in range(RELEASE_HISTORY_MAX_PAGES):
+        response = await github.get(url, headers)
+        if response.status_code != 200:
+            break
+        page = [release for release in response.json() if not release.get("draft")]
+        releases.extend(page)
+        if any(release.get("tag_name") in known_versions for release in page):
+            break
+        url = next_page_url(response.headers.get("link"))
+        if not url:
+            break
+    return releases
+
+async def get_github_repo_info(repo_url, known_versions=()):
+    """Получает информацию о репозитории с GitHub"""
+    parsed = parse_github_url(repo_url)
+    if not parsed:
+        return None
+    
+    username, repo_name = parsed
+    
     # Получаем данные через GitHub API
-    headers = {}
-    # Если есть токен GitHub, используем его для увеличения лимита запросов
-    github_token = os.environ.get("GITHUB_TOKEN")
-    if github_token:
-        headers["Authorization"] = f"token {github_token}"
+    headers = github_app_headers()
+    
+    # Запрашиваем репозиторий, новые релизы, пользователя и темы одновременно
+    api_url = f"{GITHUB_API_URL}/repos/{username}/{repo_name}"
+    user_url = f"{GITHUB_API_URL}/users/{username}"
+    topics_url = f"{GITHUB_API_URL}/repos/{username}/{repo_name}/topics"
+    topics_headers = dict(headers, Accept="application/vnd.github.mercy-preview+json")
+    
+    response, releases_response, user_response, topics_response = await asyncio.gather(
+        github.get(api_url, headers),
+        get_github_releases(username, repo_name, headers, known_versions),
+        github.get(user_url, headers),
+        github.get(topics_url, topics_headers),
+        return_exceptions=True
+    )
     
     # Получаем данные о репозитории
-    api_url = f"https://api.github.com/repos/{username}/{repo_name}"
     try:
-        response = requests.get(api_url, headers=headers)
+        if isinstance(response, Exception):
+            raise response
         response.raise_for_status()  # Вызовет исключение при ошибке HTTP
         data = response.json()
     except Exception as e:
         print(f"Error fetching repo data: {e}")
         return None
     
-    # Получаем последний релиз
-    releases_url = f"https://api.github.com/repos/{username}/{repo_name}/releases/latest"
+    # Последний релиз - первый не черновик и не пре-релиз (как /releases/latest)
     try:
-        releases_response = requests.get(releases_url, headers=headers)
-        release_data = {}
-        if releases_response.status_code == 200:
-            release_data = releases_response.json()
+        if isinstance(releases_response, Exception):
+            raise releases_response
+        releases_data = releases_response
     except Exception as e:
         print(f"Error fetching release data: {e}")
-        release_data = {}
+        releases_data = []
+    release_data = next((release for release in releases_data if not release.get("prerelease")), {})
     
     # Получаем информацию о пользователе
-    user_url = f"https://api.github.com/users/{username}"
     try:
-        user_response = requests.get(user_url, headers=headers)
+        if isinstance(user_response, Exception):
+            raise user_response
         user_data = {}
         if user_response.status_code == 200:
             user_data = user_response.json()
@@ -212,30 +578,38 @@ def get_github_repo_info(repo_url):
         print(f"Error fetching user data: {e}")
         user_data = {}
 
-    if user_response.status_code == 200:
-        user_data = user_response.json()
-
-    # Список доверенных разработчиков
-    trusted_developers = ["trusted_dev1", "trusted_dev2", "trusted_dev3"]
-    clteam_members = ["Rejzi-dich", "CodeLibraty"]
-    
-    # Определяем статус разработчика
-    developer_status = None
-    if username in clteam_members:
-        developer_status = "CLteam Member"
-    elif username in trusted_developers:
-        developer_status = "Trusted Developer"
-
     # Получаем темы репозитория
-    topics_url = f"https://api.github.com/repos/{username}/{repo_name}/topics"
-    headers["Accept"] = "application/vnd.github.mercy-preview+json"
-    
+    all_topics = []
     try:
-        topics_response = requests.get(topics_url, headers=headers)
-        all_topics = []
+        if isinstance(topics_response, Exception):
+            raise topics_response
         if topics_response.status_code == 200:
             all_topics = topics_response.json().get("names", [])
-        
+    except Exception as e:
+        print(f"Error fetching topics: {e}")
+    
+    return build_repo_info(repo_url, username, repo_name, data, release_data, user_data, all_topics, releases_data)
+
+async def get_github_repo_info_batch(repo_urls):
+    """Получает информацию о многих репозиториях через GraphQL (по пачкам за один запрос)"""
+    parsed = [parse_github_url(url) for url in repo_urls]
+    repos = [p for p in parsed if p]
+    fetched = dict(zip(repos, await github_graphql.fetch_many(repos)))
+    
+    results = []
+    for repo_url, repo in zip(repo_urls, parsed):
+        raw = fetched.get(repo) if repo else None
+        if raw is None:
+            results.append(None)
+            continue
+        data, release_data, user_data, all_topics, releases_data = raw
+        results.append(build_repo_info(repo_url, repo[0], repo[1], data, release_data, user_data, all_topics,
+                                       releases_data))
+    return results
+
+def filter_topics(all_topics):
+    """Оставляет только разрешённые темы репозитория"""
+    try:
         # Фильтруем темы, оставляя только разрешенные
         filtered_topics = [topic for topic in all_topics if topic in ALLOWED_TAGS]
         
@@ -244,17 +618,32 @@ def get_github_repo_info(repo_url):
             filtered_topics = ["other"]
     except:
         filtered_topics = []
+    return filtered_topics
 
-    # Форматируем даты для лучшего отображения
-    def format_date(date_str):
-        if not date_str:
-            return "N/A"
-        try:
-            from datetime import datetime
-            dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-            return dt.strftime("%d %b %Y")
-        except:
-            return date_str
+# Форматируем даты для лучшего отображения
+def format_github_date(date_str):
+    if not date_str:
+        return "N/A"
+    try:
+        dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+        return dt.strftime("%d %b %Y")
+    except:
+        return date_str
+
+def build_repo_info(repo_url, username, repo_name, data, release_data, user_data, all_topics, releases_data=()):
+    """Собирает данные о репозитории из ответов GitHub API в единый словарь"""
+    # Список доверенных разработчиков
+    trusted_developers = ["trusted_dev1", "trusted_dev2", "trusted_dev3"]
+    clteam_members = ["Rejzi-dich", "CodeLibraty"]
+    
+    # Определяем статус разработчика
+    developer_status = None
+    if username in clteam_members:
+        developer_status = "CLteam Member"
+    elif username in trusted_developers:
+        developer_status = "Trusted Developer"
+
+    filtered_topics = filter_topics(all_topics)
     
     return {
         "name": data.get("name", repo_name),
@@ -266,8 +655,8 @@ def get_github_repo_info(repo_url):
         "watchers": data.get("watchers_count", 0),
         "language": data.get("language", ""),
         "open_issues": data.get("open_issues_count", 0),
-        "created_at": format_date(data.get("created_at", "")),
-        "updated_at": format_date(data.get("updated_at", "")),
+        "created_at": format_github_date(data.get("created_at", "")),
+        "updated_at": format_github_date(data.get("updated_at", "")),
         "github_url": repo_url,
         "owner": {
             "login": username,
@@ -276,13 +665,29 @@ def get_github_repo_info(repo_url):
             "bio": user_data.get("bio", ""),
             "status": developer_status
         },
-        "release": {
-            "version": release_data.get("tag_name", ""),
-            "published_at": format_date(release_data.get("published_at", "")),
-            "download_url": next((asset["browser_download_url"] for asset in release_data.get("assets", []) 
-                                if asset["name"].endswith(".ryx")), ""),
-            "body": release_data.get("body", "")
-        }
+        "release": build_release_info(release_data),
+        "releases": [build_release_entry(release) for release in releases_data
+                     if release.get("tag_name") and not release.get("draft")]
+    }
+
+def build_release_entry(release_data):
+    """Запись истории версий: версия, дата и .ryx-файл релиза"""
+    info = build_release_info(release_data)
+    return {
+        "version": info["version"],
+        "published_at": info["published_at"],
+        "download_url": info["download_url"],
+        "prerelease": bool(release_data.get("prerelease")),
+    }
+
+def build_release_info(release_data):
+    """Данные релиза в том виде, в каком их читает apply_repo_info"""
+    return {
+        "version": release_data.get("tag_name", ""),
+        "published_at": format_github_date(release_data.get("published_at", "")),
+        "download_url": next((asset["browser_download_url"] for asset in release_data.get("assets", []) 
+                            if asset["name"].endswith(".ryx")), ""),
+        "body": release_data.get("body", "")
     }
 
 @app.get("/api/user/repos")
@@ -290,35 +695,30 @@ async def get_user_repos(user: dict = Depends(get_current_user)):
     if not user or "access_token" not in user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # Получаем репозитории пользователя
-    repos_url = "https://api.github.com/user/repos?sort=updated&per_page=100"
-    headers = {
-        "Authorization": f"token {user['access_token']}",
-        "Accept": "application/json"
-    }
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(repos_url, headers=headers)
-        repos_data = response.json()
+    cache_key = (user["login"].lower(), "repos")
+    cached = user_github_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    # Получаем репозитории организаций пользователя
-    orgs_url = "https://api.github.com/user/orgs"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(orgs_url, headers=headers)
-        orgs_data = response.json()
+    headers = github_user_headers(user)
     
-    org_repos = []
-    for org in orgs_data:
-        org_repos_url = f"https://api.github.com/orgs/{org['login']}/repos?per_page=100"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(org_repos_url, headers=headers)
-            org_repos.extend(response.json())
+    # Репозитории пользователя и репозитории всех его организаций запрашиваем одновременно
+    repos_url = f"{GITHUB_API_URL}/user/repos?sort=updated&per_page=100"
+    orgs_data = await get_user_orgs(user)
+    results = await asyncio.gather(
+        github.get_all(repos_url, headers),
+        *(github.get_all(f"{GITHUB_API_URL}/orgs/{org['login']}/repos?per_page=100", headers)
+          for org in orgs_data)
+    )
     
-    # Объединяем и форматируем данные
-    all_repos = repos_data + org_repos
+    # Объединяем и форматируем данные (репозиторий может прийти и как личный, и как репозиторий организации)
     formatted_repos = []
+    seen_urls = set()
     
-    for repo in all_repos:
+    for repo in (repo for repos in results for repo in repos):
+        if repo["html_url"] in seen_urls:
+            continue
+        seen_urls.add(repo["html_url"])
         formatted_repos.append({
             "name": repo["name"],
             "description": repo["description"],
@@ -331,8 +731,58 @@ async def get_user_repos(user: dict = Depends(get_current_user)):
     # Сортируем по количеству звезд
     formatted_repos.sort(key=lambda x: x["stars"], reverse=True)
     
+    user_github_cache.set(cache_key, formatted_repos)
     return formatted_repos
 
+def github_user_headers(user):
+    return {
+        "Authorization": f"token {user['access_token']}",
+        "Accept": "application/json"
+    }
+
+async def get_user_orgs(user):
+    """Организации пользователя (кешируются на USER_GITHUB_CACHE_TTL)"""
+    cache_key = (user["login"].lower(), "orgs")
+    orgs_data = user_github_cache.get(cache_key)
+    if orgs_data is None:
+        orgs_data = await github.get_all(f"{GITHUB_API_URL}/user/orgs?per_page=100", github_user_headers(user))
+        user_github_cache.set(cache_key, orgs_data)
+    return orgs_data
+
+@app.get("/admin/github-cache")
+async def github_cache_stats():
+    return github_cache.stats()
+
+@app.get("/admin/page-cache")
+async def page_cache_stats():
+    return page_cache.stats()
+
+def app_rate_limits(position):
+    """X-RateLimit-Remaining (0) или секунды до X-RateLimit-Reset (1) токена приложения по ресурсам"""
+    values = {}
+    for resource in ("core", "graphql"):
+        value = github.rate_limit(os.environ.get("GITHUB_TOKEN"), resource)[position]
+        if value is not None:
+            values[(("resource", resource),)] = value if position == 0 else max(0, value - time.time())
+    return values
+
+metrics.gauge("github_rate_limit_remaining", "Last X-RateLimit-Remaining seen for the app token",
+              lambda: app_rate_limits(0))
+metrics.gauge("github_rate_limit_reset_seconds", "Seconds until the app token rate limit resets",
+              lambda: app_rate_limits(1))
+metrics.gauge("github_cache_hit_ratio", "Share of GitHub GETs served from cache or revalidated with 304",
+              lambda: github_cache.stats()["hit_ratio"])
+metrics.gauge("github_cache_requests", "GitHub cache lookups by result",
+              lambda: {(("result", name),): github_cache.stats()[name] for name in ("hits", "misses", "not_modified")})
+metrics.gauge("page_cache_hit_ratio", "Share of anonymous page views served from the page cache",
+              lambda: page_cache.hits / max(1, page_cache.hits + page_cache.misses))
+metrics.gauge("catalog_packages", "Packages in the catalog", lambda: len(catalog.all()))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Метрики процесса в текстовом формате Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/my-packages", response_class=HTMLResponse)
 async def my_packages(request: Request, user: dict = Depends(get_current_user)):
     if not user:
@@ -340,12 +790,8 @@ async def my_packages(request: Request, user: dict = Depends(get_current_user)):
     
     packages = load_packages()
     
-    # Фильтруем пакеты, принадлежащие пользователю
-    user_packages = []
-    for i, package in enumerate(packages):
-        if package.get("owner", {}).get("login") == user["login"] or package.get("submitted_by") == user["login"]:
-            package["index"] = i  # Добавляем индекс для ссылок
-            user_packages.append(package)
+    # Пакеты, принадлежащие пользователю (по индексу владельцев в каталоге)
+    user_packages = [packages[i] for i in catalog.owned_by(user["login"])]
     
     return templates.TemplateResponse("my_packages.html", {
         "request": request,
@@ -361,6 +807,7 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -383,9 +830,8 @@ async def github_callback(code: str):
     }
     headers = {"Accept": "application/json"}
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(token_url, data=data, headers=headers)
-        token_data = response.json()
+    response = await github.post(token_url, data=data, headers=headers)
+    token_data = response.json()
     
     if "access_token" not in token_data:
         raise HTTPException(status_code=400, detail="Could not get access token")
@@ -393,17 +839,16 @@ async def github_callback(code: str):
     access_token = token_data["access_token"]
     
     # Получение информации о пользователе
-    user_url = "https://api.github.com/user"
+    user_url = f"{GITHUB_API_URL}/user"
     headers = {
         "Authorization": f"token {access_token}",
         "Accept": "application/json"
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(user_url, headers=headers)
-        user_data = response.json()
+    response = await github.get(user_url, headers)
+    user_data = response.json()
     
-    # Создание JWT токена
+    # Данные сессии
     token_data = {
         "github_id": user_data["id"],
         "login": user_data["login"],
@@ -412,17 +857,31 @@ async def github_callback(code: str):
         "access_token": access_token
     }
     
-    jwt_token = create_access_token(token_data)
+    # В режиме серверных сессий в cookie попадает только id сессии
+    if session_store is not None:
+        session_value = session_store.create(token_data, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    else:
+        session_value = create_access_token(token_data)
     
     # Создаем ответ с установкой cookie
     response = RedirectResponse(url="/")
-    response.set_cookie(key="session", value=jwt_token, httponly=True, max_age=60*60*24)
+    response.set_cookie(key="session", value=session_value, httponly=True, max_age=60*60*24)
     
     return response
 
 # Маршрут для выхода
 @app.get("/logout")
-async def logout():
+async def logout(session: Optional[str] = Cookie(None), user: dict = Depends(get_current_user)):
+    # Сбрасываем закешированные организации и репозитории пользователя
+    if user:
+        user_github_cache.delete_prefix((user["login"].lower(),))
+    
+    # Отзываем сессию
+    if session:
+        if session_store is not None:
+            session_store.delete(session)
+        verified_tokens.discard(session)
+    
     response = RedirectResponse(url="/")
     response.delete_cookie(key="session")
     return response
@@ -442,7 +901,7 @@ async def check_repo_ownership(repo_url: str, user_data: dict):
         return False
     
     repo_owner = parts[username_index]
-    repo_name = parts[username_index + 1] if username_index + 1 < len(parts) else None
+    repo_name = parts[username_index + 1].removesuffix(".git") if username_index + 1 < len(parts) else None
     
     if not repo_name:
         return False
@@ -452,15 +911,7 @@ async def check_repo_ownership(repo_url: str, user_data: dict):
         return True
     
     # Проверяем, принадлежит ли репозиторий организации пользователя
-    orgs_url = "https://api.github.com/user/orgs"
-    headers = {
-        "Authorization": f"token {user_data['access_token']}",
-        "Accept": "application/json"
-    }
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(orgs_url, headers=headers)
-        orgs_data = response.json()
+    orgs_data = await get_user_orgs(user_data)
     
     for org in orgs_data:
         if org["login"].lower() == repo_owner.lower():
@@ -470,99 +921,382 @@ async def check_repo_ownership(repo_url: str, user_data: dict):
 
 # Обновляем маршрут главной страницы
 @app.get("/", response_class=HTMLResponse)
-async def home(request: Request, q: Optional[str] = None, user: dict = Depends(get_current_user)):
-    packages = load_packages()
-    
-    # Фильтрация по поисковому запросу
-    if q:
-        packages = [pkg for pkg in packages if q.lower() in pkg["name"].lower() or 
-                   (pkg.get("description") and q.lower() in pkg["description"].lower())]
+async def home(request: Request, q: Optional[str] = None, tag: Optional[str] = None,
+               language: Optional[str] = None, sort: Optional[str] = None, page: int = 1,
+               user: dict = Depends(get_current_user)):
+    def render():
+        packages, package_ids = query_packages(q, tag, language, sort)
+        return render_package_list(request, user, packages, package_ids, page, sort,
+                                   search_query=q, tag=tag, language=language)
+    
+    return cached_page(request, user, render)
+
+def render_package_list(request, user, packages, package_ids, page, sort, **context):
+    """Рендерит страницу списка пакетов index.html"""
+    # На страницу попадает только PAGE_SIZE пакетов; в шаблон они передаются вместе с id
+    total_pages = max(1, (len(package_ids) + PAGE_SIZE - 1) // PAGE_SIZE)
+    page = min(max(page, 1), total_pages)
+    page_ids, _ = paginate(package_ids, (page - 1) * PAGE_SIZE, PAGE_SIZE)
     
     return templates.TemplateResponse("index.html", {
         "request": request,
-        "packages": packages,
-        "search_query": q,
-        "user": user
+        "packages": [(packages[i]["id"], packages[i]) for i in page_ids],
+        "total": len(package_ids),
+        "page": page,
+        "total_pages": total_pages,
+        "sort": sort,
+        "user": user,
+        **context
     })
 
-@app.get("/categories", response_class=HTMLResponse)
-async def categories(request: Request, user: dict = Depends(get_current_user)):
-    packages = load_packages()
+@app.get("/api/packages")
+async def api_packages(q: Optional[str] = None, tag: Optional[str] = None, language: Optional[str] = None,
+                       sort: Optional[str] = None, offset: int = 0, limit: int = PAGE_SIZE,
+                       fields: Optional[str] = None):
+    packages, package_ids = query_packages(q, tag, language, sort)
     
-    # Собираем статистику по тегам
-    tag_stats = {}
-    for package in packages:
-        for topic in package.get("topics", []):
-            if topic in tag_stats:
-                tag_stats[topic] += 1
-            else:
-                tag_stats[topic] = 1
+    offset = max(offset, 0)
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    page_ids, next_offset = paginate(package_ids, offset, limit)
+    selected_fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else DEFAULT_API_FIELDS
     
-    # Сортируем теги по количеству пакетов
-    sorted_tags = sorted(tag_stats.items(), key=lambda x: x[1], reverse=True)
+    return {
+        "total": len(package_ids),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset,
+        "items": [project(packages[i]["id"], packages[i], selected_fields) for i in page_ids]
+    }
+
+@app.get("/index/v1/packages.json")
+async def index_packages(request: Request, since: Optional[float] = None):
+    # since - значение last_modified из прошлого ответа: вернутся только изменённые пакеты
+    load_packages()
+    return package_index.respond(request, package_index.feed(since))
+
+@app.get("/index/v1/packages/{name}.json")
+async def index_package(request: Request, name: str):
+    load_packages()
+    document = package_index.package(name)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Package not found")
+    return package_index.respond(request, document)
+
+@app.get("/categories", response_class=HTMLResponse)
+async def categories(request: Request, user: dict = Depends(get_current_user)):
+    # Счётчики поддерживаются инкрементально при изменении каталога
+    load_packages()
     
-    return templates.TemplateResponse("categories.html", {
+    return cached_page(request, user, lambda: templates.TemplateResponse("categories.html", {
         "request": request,
-        "tags": sorted_tags,
+        "tags": aggregates.tags(),
+        "languages": aggregates.languages(),
+        "owners": aggregates.owners(CATEGORY_OWNERS),
         "user": user
-    })
+    }))
+
+@app.get("/categories/{tag}", response_class=HTMLResponse)
+async def category_packages(request: Request, tag: str, sort: Optional[str] = None, page: int = 1,
+                            user: dict = Depends(get_current_user)):
+    def render():
+        packages, package_ids = query_packages(tag=tag, sort=sort)
+        return render_package_list(request, user, packages, package_ids, page, sort, tag=tag)
+    
+    return cached_page(request, user, render)
 
 @app.get("/admin/update-all-packages", response_class=HTMLResponse)
 async def update_all_packages(request: Request):
-    packages = load_packages()
-    updated_count = 0
-    
-    for i, package in enumerate(packages):
-        updated_package = update_package_from_github(package)
-        if updated_package != package:
-            packages[i] = updated_package
-            updated_count += 1
-    
-    save_packages(packages)
+    # Обновление идёт в фоне, чтобы не держать HTTP-запрос открытым
+    if bulk_refresh.start():
+        message = "Started updating all packages from GitHub"
+    else:
+        message = "Update of all packages is already running"
+    progress = bulk_refresh.progress()
     
     return templates.TemplateResponse("admin_message.html", {
         "request": request,
-        "message": f"Updated {updated_count} packages from GitHub"
+        "message": f"{message}: {progress['processed']} of {progress['total']} processed. "
+                   f"Progress: /admin/update-all-packages/status"
     })
 
+@app.get("/admin/update-all-packages/status")
+async def update_all_packages_status():
+    return bulk_refresh.progress()
 
-@app.get("/package/{package_id}", response_class=HTMLResponse)
-async def package_details(request: Request, package_id: int, user: dict = Depends(get_current_user)):
-    packages = load_packages()
+def verify_webhook_signature(body, signature):
+    """Проверяет подпись X-Hub-Signature-256 (HMAC-SHA256 тела с секретом вебхука)"""
+    if not GITHUB_WEBHOOK_SECRET or not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(GITHUB_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature[len("sha256="):], expected)
+
+def apply_repository_event(package, repository):
+    """Обновляет поля пакета из объекта repository в событии вебхука"""
+    package = dict(package)
+    package["description"] = repository.get("description", package.get("description", ""))
+    package["stars"] = repository.get("stargazers_count", package.get("stars", 0))
+    package["forks"] = repository.get("forks_count", package.get("forks", 0))
+    package["watchers"] = repository.get("watchers_count", package.get("watchers", 0))
+    package["language"] = repository.get("language", package.get("language", ""))
+    package["open_issues"] = repository.get("open_issues_count", package.get("open_issues", 0))
+    if repository.get("updated_at"):
+        package["updated_at"] = format_github_date(repository["updated_at"])
+    # Категории (topics) вебхук не меняет: все темы сохраняются только для информации
+    if "topics" in repository:
+        package["all_topics"] = repository["topics"]
+    return package
+
+def apply_release_event(package, action, release):
+    """Обновляет релиз и историю версий пакета; None - событие нельзя применить без запроса к GitHub"""
+    tag = release.get("tag_name")
+    history = package.get("releases") or []
+    if action in ("deleted", "unpublished"):
+        if tag == package.get("version"):
+            # Удалён текущий релиз: какой теперь последний, знает только GitHub
+            return None
+        return dict(package, releases=[r for r in history if r["version"] != tag])
+    if release.get("draft") or action not in ("published", "released", "edited"):
+        return package
     
-    if package_id < 0 or package_id >= len(packages):
-        raise HTTPException(status_code=404, detail="Package not found")
+    package = dict(package)
+    # Изменённый релиз заменяет свою запись в истории
+    history = [r for r in history if r["version"] != tag] if action == "edited" else history
+    package["releases"] = merge_releases(history, [build_release_entry(release)])
+    if not release.get("prerelease") and (action != "edited" or tag == package.get("version")):
+        apply_release_info(package, build_release_info(release))
+    return package
+
+@app.post("/webhooks/github")
+async def github_webhook(request: Request):
+    if not GITHUB_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook secret is not configured")
+    
+    body = await request.body()
+    if not verify_webhook_signature(body, request.headers.get("X-Hub-Signature-256")):
+        raise HTTPException(status_code=401, detail="Invalid signature")
     
-    # Обновляем данные пакета из GitHub перед отображением
-    packages[package_id] = update_package_from_github(packages[package_id])
-    save_packages(packages)
+    event = request.headers.get("X-GitHub-Event", "")
+    if event == "ping":
+        return {"status": "ok"}
     
-    package = packages[package_id]
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+    
+    repository = payload.get("repository") or {}
+    full_name = repository.get("full_name") or ""
+    if full_name.count("/") == 1:
+        index = catalog.find_repo(*full_name.split("/"))
+    else:
+        index = catalog.find(repository.get("html_url") or "")
+    if index is None:
+        return {"status": "ignored"}
+    
+    github_url = catalog.get(index)["github_url"]
+    parsed = parse_github_url(github_url)
+    if not parsed:
+        return {"status": "ignored"}
+    
+    # URL те же, что запрашивает get_github_repo_info, чтобы попасть в ключи кеша
+    owner, repo = parsed
+    api_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}"
+    headers = github_app_headers()
+    
+    if event in ("repository", "star"):
+        github_cache.invalidate(api_url, headers)
+        github_cache.invalidate(f"{api_url}/topics", dict(headers, Accept="application/vnd.github.mercy-preview+json"))
+        update = lambda package: apply_repository_event(package, repository)
+    elif event == "release":
+        github_cache.invalidate_prefix(f"{api_url}/releases?", headers)
+        if repository.get("id"):
+            # Ссылки на следующие страницы (заголовок Link) GitHub даёт по id репозитория
+            github_cache.invalidate_prefix(f"{GITHUB_API_URL}/repositories/{repository['id']}/releases?", headers)
+        release = payload.get("release") or {}
+        if apply_release_event(catalog.get(index), payload.get("action"), release) is None:
+            refresher.schedule(github_url, refresh_package, github_url)
+            return {"status": "refresh scheduled"}
+        update = lambda package: apply_release_event(package, payload.get("action"), release) or package
+    elif event == "issues":
+        labels = [label.get("name") for label in (payload.get("issue") or {}).get("labels") or []]
+        if payload.get("label"):
+            labels.append(payload["label"].get("name"))
+        if "review" not in labels:
+            return {"status": "ignored"}
+        # Отзывы хранятся не в каталоге, а в кеше: сбрасываем все страницы
+        reviews_cache.delete_prefix((owner.lower(), repo.lower()))
+        github_cache.invalidate_prefix(f"{api_url}/issues?", headers)
+        return {"status": "ok"}
+    else:
+        return {"status": "ignored"}
+    
+    catalog.replace(github_url, update)
+    return {"status": "ok"}
+
+@app.get("/package/{package_id}", response_class=HTMLResponse)
+async def package_details(request: Request, package_id: str, user: dict = Depends(get_current_user)):
+    package, redirect = resolve_package(request, package_id)
+    if redirect is not None:
+        return redirect
+    
+    # Отдаём сохранённую запись сразу, а устаревшие данные обновляем в фоне
+    if package.get("github_url") and is_stale(package, PACKAGE_REFRESH_TTL):
+        refresher.schedule(package["github_url"], refresh_package, package["github_url"])
     
     # Вычисляем процент для прогресс-бара
     stars_percent = min(package.get("stars", 0), 100)
+    stars_this_week, _ = trends.growth(package["id"], TRENDING_WINDOWS["week"])
     
-    # Получаем отзывы из GitHub
-    reviews = []
-    if package.get("github_url"):
-        # Извлекаем имя пользователя и репозитория из URL
-        parts = package["github_url"].strip("/").split("/")
-        if "github.com" in parts:
-            username_index = parts.index("github.com") + 1
-            if username_index < len(parts) - 1:
-                repo_owner = parts[username_index]
-                repo_name = parts[username_index + 1]
-                reviews = get_github_reviews(repo_owner, repo_name, limit=10)
-    
-    return templates.TemplateResponse("package.html", {
+    # Отзывы страница подгружает сама через /api/package/{id}/reviews
+    return cached_page(request, user, lambda: templates.TemplateResponse("package.html", {
         "request": request,
         "package": package,
         "package_id": package_id,
         "user": user,
         "stars_percent": stars_percent,
-        "reviews": reviews
+        "stars_this_week": stars_this_week
+    }))
+
+async def refresh_trending():
+    """Пересчитывает рейтинг и сохраняет ряды (в потоке: проход по всему каталогу)"""
+    await asyncio.to_thread(trends.compute_trending)
+    await asyncio.to_thread(trends.save)
+
+def trending_packages(window, limit):
+    """Готовый рейтинг окна window: [(пакет, запись рейтинга)]; устаревший пересчитывается в фоне.
+    
+    Запрос никогда не считает рейтинг сам: до первого пересчёта рейтинг пуст.
+    """
+    load_packages()
+    if trends.is_stale(TRENDING_INTERVAL):
+        refresher.schedule("trending", refresh_trending)
+    
+    result = []
+    for entry in trends.trending(window, limit):
+        package = catalog.get_by_id(entry["id"])
+        if package is not None:
+            result.append((package, entry))
+    return result
+
+@app.get("/trending", response_class=HTMLResponse)
+async def trending_page(request: Request, window: str = "week", user: dict = Depends(get_current_user)):
+    if window not in TRENDING_WINDOWS:
+        window = "week"
+    entries = trending_packages(window, PAGE_SIZE)
+    
+    return templates.TemplateResponse("trending.html", {
+        "request": request,
+        "user": user,
+        "window": window,
+        "windows": list(TRENDING_WINDOWS),
+        "entries": entries,
+        "computed": trends.computed_at is not None
     })
 
+@app.get("/api/trending")
+async def api_trending(window: str = "week", limit: int = PAGE_SIZE):
+    if window not in TRENDING_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of: {', '.join(TRENDING_WINDOWS)}")
+    
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    entries = trending_packages(window, limit)
+    return {
+        "window": window,
+        "computed_at": trends.computed_at,
+        "items": [dict(entry, name=package.get("name"), github_url=package.get("github_url"))
+                  for package, entry in entries]
+    }
+
+@app.get("/admin/trends")
+async def trends_stats():
+    return trends.stats()
+
+@app.api_route("/download/{package_id}", methods=["GET", "HEAD"])
+async def download_package(request: Request, package_id: str):
+    package, redirect = resolve_package(request, package_id)
+    if redirect is not None:
+        return redirect
+    
+    if not package.get("download_url"):
+        raise HTTPException(status_code=404, detail="Package has no release to download")
+    
+    # Скачиванием считается только полный GET: HEAD и докачка частями (Range) не учитываются
+    download_url = package["download_url"]
+    if artifacts is None or not download_url.startswith("https://github.com/"):
+        if request.method == "GET" and "range" not in request.headers:
+            trends.record_download(package["id"])
+        return RedirectResponse(url=download_url)
+    
+    # Хеш в записи относится к конкретному релизу: после нового релиза файл скачивается заново
+    digest = package.get("download_sha256") if package.get("mirrored_from") == download_url else None
+    filename = os.path.basename(urlparse(download_url).path)
+    if not artifacts.has(digest) and request.method == "HEAD":
+        # HEAD не запускает зеркалирование: отвечаем по записи пакета, а без неё отправляем на GitHub
+        if digest and package.get("download_size") is not None:
+            return metadata_response(digest, package["download_size"], filename=filename)
+        return RedirectResponse(url=download_url)
+    if not artifacts.has(digest):
+        try:
+            digest, size = await artifacts.fetch(download_url, github.download)
+        except Exception as e:
+            print(f"Error mirroring {download_url}: {e}")
+            return RedirectResponse(url=download_url)
+        
+        def record_checksum(current):
+            if current.get("download_url") != download_url:
+                return current
+            return dict(current, download_sha256=digest, download_size=size, mirrored_from=download_url)
+        
+        catalog.replace(package["github_url"], record_checksum)
+    
+    response = artifacts.response(digest, request, filename=filename)
+    if request.method == "GET" and response.status_code == 200:
+        trends.record_download(package["id"])
+    return response
+
+@app.api_route("/artifacts/sha256/{digest}", methods=["GET", "HEAD"])
+async def download_artifact(request: Request, digest: str):
+    # Адрес определяется содержимым, поэтому ответ можно кешировать навсегда
+    if artifacts is None or not artifacts.has(digest):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return artifacts.response(digest, request, immutable=True)
+
+@app.get("/api/package/{package_id}/versions")
+async def package_versions(request: Request, package_id: str):
+    package, redirect = resolve_package(request, package_id)
+    if redirect is not None:
+        return redirect
+    
+    return {
+        "id": package["id"],
+        "latest": package.get("version") or None,
+        "versions": package.get("releases") or []
+    }
+
+@app.get("/api/package/{package_id}/reviews")
+async def package_reviews(request: Request, package_id: str, cursor: Optional[str] = None):
+    package, redirect = resolve_package(request, package_id)
+    if redirect is not None:
+        return redirect
+    
+    # Курсор - номер страницы отзывов в GitHub Issues
+    try:
+        page = int(cursor) if cursor else 1
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if page < 1:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    parsed = parse_github_url(package.get("github_url") or "")
+    if not parsed:
+        return {"reviews": [], "next_cursor": None}
+    
+    reviews, has_more = await get_github_reviews(parsed[0], parsed[1], limit=REVIEWS_PAGE_SIZE, page=page)
+    return {
+        "reviews": reviews,
+        "next_cursor": str(page + 1) if has_more else None
+    }
+
 # Обновляем маршрут добавления пакета
 @app.get("/add", response_class=HTMLResponse)
 async def add_package_form(request: Request, user: dict = Depends(get_current_user)):
@@ -574,11 +1308,51 @@ async def add_package_form(request: Request, user: dict = Depends(get_current_us
         "user": user
     })
 
+def new_package_record(github_url, repo_info, submitted_by):
+    """Запись нового пакета из get_github_repo_info"""
+    return {
+        "name": repo_info["name"],
+        "description": repo_info["description"],
+        "github_url": canonical_github_url(github_url) or github_url,
+        "stars": repo_info["stars"],
+        "forks": repo_info.get("forks", 0),
+        "watchers": repo_info.get("watchers", 0),
+        "language": repo_info.get("language", ""),
+        "open_issues": repo_info.get("open_issues", 0),
+        "created_at": repo_info.get("created_at", ""),
+        "updated_at": repo_info.get("updated_at", ""),
+        "owner": repo_info["owner"],
+        "version": repo_info["release"].get("version", ""),
+        "download_url": repo_info["release"].get("download_url", ""),
+        "published_at": repo_info["release"].get("published_at", ""),
+        "release_notes": repo_info["release"].get("body", ""),
+        "releases": repo_info["releases"],
+        "submitted_by": submitted_by,
+        "refreshed_at": time.time()
+    }
+
 @app.post("/add")
 async def add_package(request: Request, github_url: str = Form(...), user: dict = Depends(get_current_user)):
     if not user:
         return RedirectResponse(url="/login/github")
     
+    parsed = parse_github_url(github_url)
+    if not parsed:
+        return templates.TemplateResponse("add_package.html", {
+            "request": request,
+            "user": user,
+            "error": "Invalid GitHub repository"
+        })
+    
+    # Один репозиторий нельзя добавить дважды (http/https, .git, /tree/... - тот же репозиторий)
+    if catalog.find_repo(*parsed) is not None:
+        return templates.TemplateResponse("add_package.html", {
+            "request": request,
+            "user": user,
+            "error": "This repository is already in the store"
+        })
+    github_url = canonical_github_url(github_url)
+    
     # Проверяем принадлежность репозитория
     is_owner = await check_repo_ownership(github_url, user)
     if not is_owner:
@@ -589,7 +1363,7 @@ async def add_package(request: Request, github_url: str = Form(...), user: dict
         })
     
     # Получаем информацию о репозитории
-    repo_info = get_github_repo_info(github_url)
+    repo_info = await get_github_repo_info(github_url)
     
     if not repo_info:
         return templates.TemplateResponse("add_package.html", {
@@ -598,34 +1372,119 @@ async def add_package(request: Request, github_url: str = Form(...), user: dict
             "error": "Invalid GitHub repository"
         })
     
-    # Создаем запись о пакете
-    new_package = {
-        "name": repo_info["name"],
-        "description": repo_info["description"],
-        "github_url": github_url,
-        "stars": repo_info["stars"],
-        "forks": repo_info.get("forks", 0),
-        "watchers": repo_info.get("watchers", 0),
-        "language": repo_info.get("language", ""),
-        "open_issues": repo_info.get("open_issues", 0),
-        "created_at": repo_info.get("created_at", ""),
-        "updated_at": repo_info.get("updated_at", ""),
-        "owner": repo_info["owner"],
-        "version": repo_info["release"].get("version", ""),
-        "download_url": repo_info["release"].get("download_url", ""),
-        "published_at": repo_info["release"].get("published_at", ""),
-        "release_notes": repo_info["release"].get("body", ""),
-        "submitted_by": user["login"]
-    }
-    
     # Добавляем пакет в список
-    packages = load_packages()
-    packages.append(new_package)
-    save_packages(packages)
+    try:
+        catalog.add(new_package_record(github_url, repo_info, user["login"]))
+    except DuplicatePackageError:
+        return templates.TemplateResponse("add_package.html", {
+            "request": request,
+            "user": user,
+            "error": "This repository is already in the store"
+        })
     
     # Перенаправляем на главную страницу
     return RedirectResponse(url="/", status_code=303)
 
+def has_ryx_release(repo_info):
+    return bool(repo_info["release"].get("download_url") or
+                any(release.get("download_url") for release in repo_info.get("releases") or []))
+
+async def owned_repo_owners(user, owners):
+    """Какие из владельцев (в нижнем регистре) - сам пользователь или его организации"""
+    allowed = {owner for owner in owners if owner == user["login"].lower()}
+    if owners - allowed:
+        # Список организаций запрашивается один раз на весь импорт
+        orgs = {org["login"].lower() for org in await get_user_orgs(user)}
+        allowed |= owners & orgs
+    return allowed
+
+async def run_bulk_import(job, user):
+    """Импортирует репозитории задачи: проверка владельцев, загрузка метаданных и одна запись в каталог"""
+    try:
+        pending = []
+        for github_url in job.repo_urls:
+            if catalog.find_repo(*parse_github_url(github_url)) is not None:
+                job.skip(github_url, "already in the store")
+            else:
+                pending.append(github_url)
+        
+        owners = {parse_github_url(url)[0].lower() for url in pending}
+        allowed = await owned_repo_owners(user, owners)
+        for github_url in [url for url in pending if parse_github_url(url)[0].lower() not in allowed]:
+            job.skip(github_url, "not owned by you or your organizations")
+        pending = [url for url in pending if parse_github_url(url)[0].lower() in allowed]
+        
+        # Метаданные всех репозиториев загружаются одновременно (GraphQL - пачками)
+        job.stage = "fetching"
+        if use_graphql():
+            repo_infos = await get_github_repo_info_batch(pending)
+            job.fetched = len(pending)
+        else:
+            async def fetch(github_url):
+                repo_info = await get_github_repo_info(github_url)
+                job.fetched += 1
+                return repo_info
+            repo_infos = await asyncio.gather(*(fetch(url) for url in pending))
+        
+        job.stage = "saving"
+        new_packages = []
+        for github_url, repo_info in zip(pending, repo_infos):
+            if not repo_info:
+                job.skip(github_url, "repository not found")
+            elif not has_ryx_release(repo_info):
+                job.skip(github_url, "no release with a .ryx file")
+            else:
+                new_packages.append(new_package_record(github_url, repo_info, user["login"]))
+        
+        for package, package_id in zip(new_packages, catalog.add_many(new_packages)):
+            if package_id is None:
+                job.skip(package["github_url"], "already in the store")
+            else:
+                job.added.append(package_id)
+        job.finish()
+    except Exception as e:
+        print(f"Error importing packages: {e}")
+        job.finish(error=str(e))
+
+@app.post("/api/packages/import", status_code=202)
+async def import_packages(urls: str = Form(""), org: str = Form(""), user: dict = Depends(get_current_user)):
+    # urls - адреса репозиториев через пробел или с новой строки; org - импорт всей организации
+    if not user or "access_token" not in user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    repos = {}  # (владелец, репозиторий) в нижнем регистре -> как написано
+    if org.strip():
+        org_key = org.strip().lower()
+        owned = await owned_repo_owners(user, {org_key})
+        if org_key not in owned:
+            raise HTTPException(status_code=403, detail="You can only import your own organizations")
+        for repo in await get_user_repos(user):
+            if repo["owner"].lower() == org_key:
+                repos[(org_key, repo["name"].lower())] = (repo["owner"], repo["name"])
+    for url in urls.split():
+        parsed = parse_github_url(url)
+        if not parsed:
+            raise HTTPException(status_code=400, detail=f"Not a GitHub repository URL: {url}")
+        owner, name = parsed
+        repos.setdefault((owner.lower(), name.lower()), (owner, name))
+    
+    if not repos:
+        raise HTTPException(status_code=400, detail="Nothing to import")
+    if len(repos) > BULK_IMPORT_MAX_REPOS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_IMPORT_MAX_REPOS} repositories per import")
+    
+    job = BulkImportJob(user["login"], [f"https://github.com/{owner}/{name}" for owner, name in sorted(repos.values())])
+    import_jobs.set(job.id, job)
+    refresher.schedule(f"import:{job.id}", run_bulk_import, job, user)
+    return {"job_id": job.id, "total": len(job.repo_urls), "status_url": f"/api/packages/import/{job.id}"}
+
+@app.get("/api/packages/import/{job_id}")
+async def import_packages_status(job_id: str, user: dict = Depends(get_current_user)):
+    job = import_jobs.get(job_id)
+    if job is None or not user or job.login != user["login"]:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job.progress()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,193 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Границы корзин гистограмм задержек, в секундах
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Фазы текущего запроса для заголовка Server-Timing (None - запрос их не собирает)
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # кортеж меток -> [счётчики корзин, сумма, количество]
+
+    def observe(self, labels, value):
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            labels = _format_labels(key)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{_format_labels(key + (("le", repr(bound)),))} {bucket_count}')
+            lines.append(f'{self.name}_bucket{_format_labels(key + (("le", "+Inf"),))} {count}')
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Metrics:
+    """Метрики процесса в текстовом формате Prometheus.
+
+    Гистограммы задержек заполняются через timed() и observe(), значения
+    вроде остатка лимита GitHub или доли попаданий в кеш снимаются
+    функциями-датчиками (gauge) в момент запроса /metrics. У каждого
+    воркера свои метрики; Prometheus суммирует их сам.
+    """
+
+    def __init__(self, prefix="ryton"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = []
+
+    def histogram(self, name, help_text):
+        full_name = f"{self.prefix}_{name}"
+        with self._lock:
+            if full_name not in self._histograms:
+                self._histograms[full_name] = Histogram(full_name, help_text)
+            return self._histograms[full_name]
+
+    def observe(self, name, value, **labels):
+        histogram = self._histograms[f"{self.prefix}_{name}"]
+        with self._lock:
+            histogram.observe(labels, value)
+
+    def inc(self, name, help_text, value=1, **labels):
+        full_name = f"{self.prefix}_{name}"
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counter = self._counters.setdefault(full_name, (help_text, {}))[1]
+            counter[key] = counter.get(key, 0) + value
+
+    def gauge(self, name, help_text, func):
+        """Регистрирует датчик: func() -> число, {метки: число} или None"""
+        self._gauges.append((f"{self.prefix}_{name}", help_text, func))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for histogram in self._histograms.values():
+                lines.extend(histogram.render())
+            for name, (help_text, series) in self._counters.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                lines += [f"{name}{_format_labels(key)} {value}" for key, value in sorted(series.items())]
+        for name, help_text, func in self._gauges:
+            try:
+                value = func()
+            except Exception as e:
+                print(f"Error reading metric {name}: {e}")
+                continue
+            if value is None:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            series = value if isinstance(value, dict) else {(): value}
+            for key, number in series.items():
+                lines.append(f"{name}{_format_labels(key)} {float(number)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.histogram("http_request_duration_seconds", "Request latency by route")
+metrics.histogram("phase_duration_seconds", "Latency of request phases (catalog, templates)")
+metrics.histogram("github_request_duration_seconds", "Latency of GitHub API calls by endpoint")
+
+
+@contextmanager
+def timed(phase, metric=None, **labels):
+    """Замеряет блок кода для Server-Timing текущего запроса и гистограммы.
+
+    Без metric время пишется в phase_duration_seconds с меткой phase,
+    иначе - в гистограмму metric с метками labels.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if metric is None:
+            metrics.observe("phase_duration_seconds", elapsed, phase=phase)
+        else:
+            metrics.observe(metric, elapsed, **labels)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((phase, elapsed))
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in key)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + "}"
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: задержка каждого запроса по маршруту и заголовок Server-Timing.
+
+    Server-Timing добавляется только если он включён (server_timing=True)
+    и клиент попросил его заголовком X-Server-Timing: 1.
+    """
+
+    def __init__(self, app, server_timing=False):
+        self.app = app
+        self.server_timing = server_timing
+        self._route_paths = None
+
+    def _route_label(self, scope):
+        # Маршрут (шаблон пути) определяется по endpoint, который роутер кладёт в scope
+        if self._route_paths is None:
+            router = scope.get("router")
+            routes = getattr(router, "routes", None) or []
+            self._route_paths = {getattr(r, "endpoint", None) or getattr(r, "app", None): getattr(r, "path", "")
+                                 for r in routes}
+        return self._route_paths.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = []
+        token = _request_timings.set(timings)
+        want_timing = self.server_timing and (b"x-server-timing", b"1") in scope.get("headers", [])
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if want_timing:
+                    total = time.perf_counter() - start
+                    parts = [f"{_timing_name(name)};dur={elapsed * 1000:.1f}" for name, elapsed in timings]
+                    parts.append(f"total;dur={total * 1000:.1f}")
+                    message = dict(message, headers=list(message.get("headers", [])) +
+                                   [(b"server-timing", ", ".join(parts).encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            metrics.observe("http_request_duration_seconds", time.perf_counter() - start,
+                            route=self._route_label(scope), method=scope["method"], status=str(status))
+
+
+def _timing_name(name):
+    # Имя метрики в Server-Timing - токен без пробелов и разделителей
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
@@ -0,0 +1,138 @@
+import json
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi.responses import Response
+
+from page_cache import compress_entry, compressed_response
+
+INDEX_FORMAT = 1
+
+
+def index_entry(package):
+    """Запись индекса для менеджера пакетов Ryton"""
+    version = package.get("version") or ""
+    releases = package.get("releases") or []
+    entry = {
+        "id": package.get("id"),
+        "name": package.get("name"),
+        "owner": (package.get("owner") or {}).get("login"),
+        "github_url": package.get("github_url"),
+        "description": package.get("description") or "",
+        "topics": package.get("topics") or [],
+        "version": version,
+        "versions": [release["version"] for release in releases] or ([version] if version else []),
+        "releases": [{"version": r["version"], "download_url": r["download_url"] or None,
+                      "prerelease": r.get("prerelease", False)} for r in releases],
+        "download_url": package.get("download_url") or None,
+        "sha256": package.get("download_sha256"),
+        "size": package.get("download_size"),
+        "modified_at": package.get("modified_at", 0),
+    }
+    if entry["sha256"]:
+        entry["mirror_url"] = f"/artifacts/sha256/{entry['sha256']}"
+    return entry
+
+
+def _name_key(name):
+    return (name or "").casefold()
+
+
+class PackageIndex:
+    """Машиночитаемый индекс каталога (/index/v1/...).
+
+    Записи индекса пересчитываются инкрементально через подписку на
+    CatalogStore, а сериализованный и сжатый packages.json собирается
+    один раз на версию каталога. Время изменения берётся из поля
+    modified_at записей, поэтому курсор since одинаков на всех воркерах.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # id пакета -> запись индекса
+        self._by_name = {}  # имя в нижнем регистре -> id пакетов
+        self._feed = None
+        self._documents = {}  # готовые ответы /index/v1/{name}.json
+
+    def _add(self, package_id, package):
+        entry = index_entry(package)
+        self._entries[package_id] = entry
+        self._by_name.setdefault(_name_key(entry["name"]), set()).add(package_id)
+
+    def _remove(self, package_id):
+        entry = self._entries.pop(package_id, None)
+        if entry is None:
+            return
+        ids = self._by_name.get(_name_key(entry["name"]))
+        if ids is not None:
+            ids.discard(package_id)
+            if not ids:
+                del self._by_name[_name_key(entry["name"])]
+
+    def rebuild(self, packages):
+        with self._lock:
+            self._entries = {}
+            self._by_name = {}
+            for package_id, package in enumerate(packages):
+                self._add(package_id, package)
+            self._feed = None
+            self._documents = {}
+
+    def apply_changes(self, changes):
+        with self._lock:
+            for package_id, old_package, new_package in changes:
+                self._remove(package_id)
+                if new_package is not None:
+                    self._add(package_id, new_package)
+            self._feed = None
+            self._documents = {}
+
+    def _sorted_entries(self):
+        return sorted(self._entries.values(), key=lambda e: (_name_key(e["name"]), e["github_url"] or ""))
+
+    def _document(self, entries, last_modified=None, **extra):
+        if last_modified is None:
+            last_modified = max((e["modified_at"] for e in self._entries.values()), default=0)
+        document = {"format": INDEX_FORMAT, "last_modified": last_modified, **extra, "packages": entries}
+        body = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode()
+        entry = compress_entry(body, "application/json")
+        entry["last_modified"] = last_modified
+        return entry
+
+    def feed(self, since=None):
+        """Весь индекс (кешируется до изменения каталога) или только изменённое после since"""
+        with self._lock:
+            if since is not None:
+                changed = [e for e in self._sorted_entries() if e["modified_at"] > since]
+                return self._document(changed, since=since)
+            if self._feed is None:
+                self._feed = self._document(self._sorted_entries())
+            return self._feed
+
+    def package(self, name):
+        """Ответ со всеми пакетами с таким именем (у разных владельцев имена могут совпадать)"""
+        key = _name_key(name)
+        with self._lock:
+            if key not in self._by_name:
+                return None
+            document = self._documents.get(key)
+            if document is None:
+                entries = sorted((self._entries[i] for i in self._by_name[key]), key=lambda e: e["github_url"] or "")
+                document = self._documents[key] = self._document(
+                    entries, last_modified=max(e["modified_at"] for e in entries))
+            return document
+
+    def respond(self, request, entry):
+        """Ответ с ETag/Last-Modified, gzip и условными запросами"""
+        headers = {"Vary": "Accept-Encoding", "Cache-Control": "public, max-age=60"}
+        if entry.get("last_modified"):
+            headers["Last-Modified"] = formatdate(entry["last_modified"], usegmt=True)
+            # If-Modified-Since проверяем только без If-None-Match (RFC 9110)
+            since = request.headers.get("if-modified-since")
+            if since and "if-none-match" not in request.headers:
+                try:
+                    if int(entry["last_modified"]) <= parsedate_to_datetime(since).timestamp():
+                        return Response(status_code=304, headers=headers)
+                except (TypeError, ValueError):
+                    pass
+        return compressed_response(entry, request, headers)
@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаём gzip
+    brotli = None
+
+
+class PageCache:
+    """Кеш отрендеренных страниц для анонимных посетителей.
+
+    Ключ - путь, параметры запроса и версия каталога, поэтому любое
+    изменение каталога (CatalogStore.save) сразу делает старые записи
+    недостижимыми. Тела хранятся заранее сжатыми (gzip и, если установлен
+    brotli, br) со строгим ETag; If-None-Match отвечается 304.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(request, version):
+        return (request.url.path, tuple(sorted(request.query_params.multi_items())), version)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, media_type):
+        entry = compress_entry(body, media_type)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old["size"]
+            self._entries[key] = entry
+            self._size += entry["size"]
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted["size"]
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._size}
+
+    def respond(self, entry, request):
+        """Ответ из записи кеша с учётом Accept-Encoding и If-None-Match"""
+        return compressed_response(entry, request, {"Vary": "Accept-Encoding, Cookie", "Cache-Control": "no-cache"})
+
+
+def compress_entry(body, media_type):
+    """Тело ответа вместе с заранее сжатыми вариантами и строгим ETag"""
+    entry = {
+        "media_type": media_type,
+        "etag": hashlib.sha256(body).hexdigest()[:32],
+        "bodies": {"identity": body, "gzip": gzip.compress(body, compresslevel=6)},
+    }
+    if brotli is not None:
+        entry["bodies"]["br"] = brotli.compress(body, quality=5)
+    entry["size"] = sum(len(b) for b in entry["bodies"].values())
+    return entry
+
+
+def _choose_encoding(entry, accept_encoding):
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    for encoding in ("br", "gzip"):
+        if encoding in entry["bodies"] and encoding in accepted:
+            return encoding
+    return "identity"
+
+
+def compressed_response(entry, request, headers=None):
+    """Ответ из compress_entry с учётом Accept-Encoding и If-None-Match"""
+    encoding = _choose_encoding(entry, request.headers.get("accept-encoding", ""))
+    # У каждого представления свой строгий ETag
+    etag = f'"{entry["etag"]}"' if encoding == "identity" else f'"{entry["etag"]}-{encoding}"'
+    headers = dict(headers or {}, ETag=etag)
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry["bodies"][encoding], media_type=entry["media_type"], headers=headers)
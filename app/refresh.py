@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+
+def is_stale(package, ttl):
+    """Проверяет, устарела ли запись пакета относительно TTL (в секундах)"""
+    refreshed_at = package.get("refreshed_at")
+    if not refreshed_at:
+        return True
+    return time.time() - refreshed_at >= ttl
+
+
+class RefreshScheduler:
+    """Фоновое обновление пакетов в режиме stale-while-revalidate.
+
+    Одновременно для одного ключа выполняется не больше одного обновления:
+    повторные запросы, пришедшие во время обновления, просто игнорируются.
+    """
+
+    def __init__(self):
+        self._in_flight = set()
+        self._tasks = set()
+
+    def schedule(self, key, func, *args):
+        """Запускает корутину func(*args) фоновой задачей, если обновление key ещё не идёт"""
+        if key in self._in_flight:
+            return False
+        self._in_flight.add(key)
+
+        task = asyncio.get_running_loop().create_task(self._run(key, func, args))
+        # Держим ссылку на задачу, чтобы её не собрал сборщик мусора
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, key, func, args):
+        try:
+            await func(*args)
+        except Exception as e:
+            print(f"Error refreshing {key}: {e}")
+        finally:
+            self._in_flight.discard(key)
@@ -0,0 +1,187 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+
+# Разбиение на слова: буквы/цифры любого алфавита (латиница, кириллица и т.д.)
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Границы слов внутри CamelCase-имён: RytonCalc -> Ryton, Calc
+CAMEL_RE = re.compile(r"[A-ZА-ЯЁ]?[a-zа-яё]+|[A-ZА-ЯЁ]+(?![a-zа-яё])|\d+")
+
+# Вес совпадения в разных полях пакета
+FIELD_WEIGHTS = {
+    "name": 5.0,
+    "owner": 2.0,
+    "topics": 2.0,
+    "description": 1.0,
+}
+# Во сколько раз точное совпадение слова ценнее совпадения по префиксу
+EXACT_BONUS = 2.0
+
+
+def normalize(text):
+    """Приводит текст к виду для поиска: casefold и ё -> е"""
+    return text.casefold().replace("ё", "е")
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [normalize(token) for token in TOKEN_RE.findall(text)]
+
+
+def tokenize_name(name):
+    """Токены имени: целые слова плюс части CamelCase (RytonCalc -> rytoncalc, ryton, calc)"""
+    if not name:
+        return []
+    tokens = tokenize(name)
+    for word in TOKEN_RE.findall(name):
+        parts = CAMEL_RE.findall(word)
+        if len(parts) > 1:
+            tokens.extend(normalize(part) for part in parts)
+    return tokens
+
+
+class SearchIndex:
+    """Инвертированный индекс для поиска пакетов на главной странице.
+
+    Строится при загрузке каталога и обновляется инкрементально через
+    подписку на CatalogStore. Поддерживает поиск по префиксу, запросы из
+    нескольких слов (все слова должны найтись), фильтры по теме и языку
+    и ранжирование с учётом звёзд.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}   # токен -> {id пакета: вес}
+        self._doc_tokens = {}  # id пакета -> {токен: вес}
+        self._sorted_tokens = []
+        self._packages = {}
+
+    def _document(self, package):
+        weights = {}
+        fields = {
+            "name": tokenize_name(package.get("name")),
+            "owner": tokenize((package.get("owner") or {}).get("login")),
+            "topics": [t for topic in package.get("topics") or [] for t in tokenize(topic)],
+            "description": tokenize(package.get("description")),
+        }
+        for field, tokens in fields.items():
+            for token in tokens:
+                weights[token] = max(weights.get(token, 0.0), FIELD_WEIGHTS[field])
+        return weights
+
+    def _add(self, doc_id, package):
+        weights = self._document(package)
+        self._doc_tokens[doc_id] = weights
+        self._packages[doc_id] = package
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                bisect.insort(self._sorted_tokens, token)
+            postings[doc_id] = weight
+
+    def _remove(self, doc_id):
+        weights = self._doc_tokens.pop(doc_id, None)
+        self._packages.pop(doc_id, None)
+        if not weights:
+            return
+        for token in weights:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[token]
+                i = bisect.bisect_left(self._sorted_tokens, token)
+                if i < len(self._sorted_tokens) and self._sorted_tokens[i] == token:
+                    del self._sorted_tokens[i]
+
+    def rebuild(self, packages):
+        with self._lock:
+            self._postings = {}
+            self._doc_tokens = {}
+            self._packages = {}
+            for doc_id, package in enumerate(packages):
+                weights = self._document(package)
+                self._doc_tokens[doc_id] = weights
+                self._packages[doc_id] = package
+                for token, weight in weights.items():
+                    self._postings.setdefault(token, {})[doc_id] = weight
+            self._sorted_tokens = sorted(self._postings)
+
+    def snapshot_state(self):
+        with self._lock:
+            return self._postings, self._doc_tokens, self._sorted_tokens, self._packages
+
+    def restore_state(self, state):
+        with self._lock:
+            self._postings, self._doc_tokens, self._sorted_tokens, self._packages = state
+
+    def apply_changes(self, changes):
+        with self._lock:
+            for doc_id, old_package, new_package in changes:
+                if old_package is not None:
+                    self._remove(doc_id)
+                if new_package is not None:
+                    self._add(doc_id, new_package)
+
+    def _match_term(self, term):
+        """Пакеты, в которых есть слово с префиксом term: {id: лучший вес}"""
+        matches = {}
+        i = bisect.bisect_left(self._sorted_tokens, term)
+        while i < len(self._sorted_tokens) and self._sorted_tokens[i].startswith(term):
+            token = self._sorted_tokens[i]
+            bonus = EXACT_BONUS if token == term else 1.0
+            for doc_id, weight in self._postings[token].items():
+                score = weight * bonus
+                if score > matches.get(doc_id, 0.0):
+                    matches[doc_id] = score
+            i += 1
+        return matches
+
+    def search(self, query=None, topic=None, language=None, limit=None):
+        """Возвращает id пакетов, отсортированные по релевантности (не больше limit).
+
+        Запрос без единого слова (например, из одной пунктуации) не находит ничего.
+        """
+        with self._lock:
+            terms = tokenize(query) if query else []
+            if query and query.strip() and not terms:
+                return []
+            if terms:
+                # Начинаем с самого редкого слова, чтобы пересечение было минимальным
+                matches = sorted((self._match_term(term) for term in set(terms)), key=len)
+                scores = dict(matches[0])
+                for other in matches[1:]:
+                    scores = {doc_id: score + other[doc_id]
+                              for doc_id, score in scores.items() if doc_id in other}
+            else:
+                scores = {doc_id: 0.0 for doc_id in self._packages}
+
+            if topic or language:
+                topic_key = normalize(topic) if topic else None
+                language_key = normalize(language) if language else None
+                filtered = {}
+                for doc_id, score in scores.items():
+                    package = self._packages[doc_id]
+                    if topic_key and topic_key not in (normalize(t) for t in package.get("topics") or []):
+                        continue
+                    if language_key and normalize(package.get("language") or "") != language_key:
+                        continue
+                    filtered[doc_id] = score
+                scores = filtered
+
+            if not terms:
+                return sorted(scores)[:limit]
+
+            # Релевантность плюс небольшой вклад популярности (логарифм звёзд)
+            def rank(doc_id):
+                stars = self._packages[doc_id].get("stars") or 0
+                return (scores[doc_id] + math.log1p(stars), -doc_id)
+
+            if limit is not None:
+                return heapq.nlargest(limit, scores, key=rank)
+            return sorted(scores, key=rank, reverse=True)
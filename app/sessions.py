@@ -0,0 +1,124 @@
+import hashlib
+import json
+import secrets
+import sqlite3
+import threading
+import time
+
+from ttl_cache import TTLCache
+
+
+def _hash(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+class VerifiedTokenCache:
+    """LRU уже проверенных JWT-сессий, чтобы не делать jwt.decode на каждый запрос.
+
+    Ключ - хеш токена; запись живёт не дольше, чем поле exp в самом токене.
+    """
+
+    def __init__(self, max_entries=1024):
+        self._cache = TTLCache(ttl=0, max_entries=max_entries)
+
+    def get(self, token):
+        return self._cache.get(_hash(token))
+
+    def put(self, token, payload):
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            self._cache.set(_hash(token), payload, ttl=ttl)
+
+    def discard(self, token):
+        self._cache.delete(_hash(token))
+
+
+class MemorySessionStore:
+    """Серверные сессии в памяти процесса (только для одного воркера)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def create(self, data, ttl):
+        session_id = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[_hash(session_id)] = (data, time.time() + ttl)
+        return session_id
+
+    def get(self, session_id):
+        key = _hash(session_id)
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return None
+            data, expires_at = entry
+            if time.time() >= expires_at:
+                del self._sessions[key]
+                return None
+            return data
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(_hash(session_id), None)
+
+
+class SQLiteSessionStore:
+    """Серверные сессии в SQLite-файле, общем для всех воркеров.
+
+    В базе хранится только хеш идентификатора сессии, поэтому утечка
+    файла не позволяет войти под чужой сессией.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, data, ttl):
+        session_id = secrets.token_urlsafe(32)
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            # Заодно удаляем истёкшие сессии
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (_hash(session_id), json.dumps(data), now + ttl),
+            )
+        return session_id
+
+    def get(self, session_id):
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires_at > ?",
+            (_hash(session_id), time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, session_id):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (_hash(session_id),))
+
+
+def create_session_store(backend, path="sessions.sqlite3"):
+    """Хранилище серверных сессий: "memory", "sqlite" или None для JWT в cookie"""
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(path)
+    return None
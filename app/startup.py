@@ -0,0 +1,78 @@
+"""Подготовка деплоя для быстрого холодного старта.
+
+Перед деплоем (из каталога app/):
+
+    python startup.py
+
+собирает снимок каталога с готовыми индексами (CATALOG_SNAPSHOT),
+компилирует все шаблоны в байткод Jinja2 (TEMPLATE_CACHE_DIR) и собирает
+статику в static/dist/ (см. assets.py). Артефакты должны попасть в
+деплой рядом с packages.json. Снимок другого формата или от другого
+packages.json не загружается (каталог читается обычным образом), а
+индекс подписчика, чей модуль изменился после сборки снимка, строится
+заново; изменённый шаблон перекомпилируется.
+
+Vercel не запускает сборку, поэтому артефакты хранятся в репозитории;
+после изменения packages.json, шаблонов или модулей индексов их пересобирает workflow
+.github/workflows/deploy-artifacts.yml (или python startup.py вручную).
+"""
+import os
+import sys
+
+from jinja2 import FileSystemBytecodeCache
+
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """Байткод шаблонов в каталоге деплоя.
+
+    На read-only файловой системе (Vercel) запись молча пропускается:
+    шаблоны, скомпилированные при сборке, всё равно читаются.
+    """
+
+    def __init__(self, directory):
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            pass
+        super().__init__(directory)
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+def build(snapshot_path, template_cache_dir):
+    # Статику собираем до импорта main: он читает манифест при старте
+    import assets
+    asset_count = len(assets.build()["files"])
+
+    # Индексы строим из хранилища, а не из прежнего снимка
+    os.environ["CATALOG_SNAPSHOT"] = ""
+    os.environ["TEMPLATE_CACHE_DIR"] = template_cache_dir
+    import main
+    from listing import SORT_NAMES
+
+    packages = main.load_packages()
+    for sort in SORT_NAMES:
+        main.sorted_views.order(packages, sort)
+    main.catalog.write_snapshot(snapshot_path)
+
+    env = main.templates.env
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    return len(packages), len(names), asset_count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print("usage: python startup.py  (paths: CATALOG_SNAPSHOT, TEMPLATE_CACHE_DIR)")
+        sys.exit(1)
+    snapshot_path = os.environ.get("CATALOG_SNAPSHOT") or "catalog.snapshot"
+    template_cache_dir = os.environ.get("TEMPLATE_CACHE_DIR", "template_cache")
+    packages, templates, asset_count = build(snapshot_path, template_cache_dir)
+    print(f"Snapshot of {packages} packages written to {snapshot_path}, "
+          f"{templates} templates compiled into {template_cache_dir}, "
+          f"{asset_count} static assets built into static/dist")
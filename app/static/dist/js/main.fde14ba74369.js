@@ -0,0 +1,22 @@
+document.addEventListener('DOMContentLoaded', function() {
+const codeBlocks = document.querySelectorAll('.code-block');
+codeBlocks.forEach(block => {
+const copyButton = document.createElement('button');
+copyButton.className = 'btn btn-sm btn-outline-secondary copy-btn';
+copyButton.innerHTML = '<i class="fas fa-copy"></i> Copy';
+copyButton.style.position = 'absolute';
+copyButton.style.right = '10px';
+copyButton.style.top = '10px';
+block.style.position = 'relative';
+block.appendChild(copyButton);
+copyButton.addEventListener('click', function() {
+const code = block.querySelector('code').innerText;
+navigator.clipboard.writeText(code).then(() => {
+copyButton.innerHTML = '<i class="fas fa-check"></i> Copied!';
+setTimeout(() => {
+copyButton.innerHTML = '<i class="fas fa-copy"></i> Copy';
+}, 2000);
+});
+});
+});
+});
\ No newline at end of file
@@ -0,0 +1,318 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class DuplicatePackageError(ValueError):
+    """Пакет этого репозитория уже есть в каталоге"""
+
+
+class StaleCatalogError(RuntimeError):
+    """Хранилище изменил другой процесс после того, как каталог был прочитан"""
+
+
+def parse_repo_url(github_url):
+    """(owner, repo) из адреса репозитория GitHub в любой форме или None.
+
+    http/https, www., без схемы, с .git, слешем на конце или путём
+    внутри репозитория (/tree/main) - один и тот же репозиторий.
+    """
+    url = (github_url or "").strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = [part for part in urlparse(url).path.split("/") if part]
+    if len(parts) < 2:
+        return None
+    owner, repo = parts[0], parts[1].removesuffix(".git")
+    if not repo:
+        return None
+    return owner, repo
+
+
+def repo_key(github_url):
+    """Ключ уникальности пакета: owner/repo в нижнем регистре"""
+    parsed = parse_repo_url(github_url)
+    return f"{parsed[0]}/{parsed[1]}".lower() if parsed else None
+
+
+class JsonStorage:
+    """Хранилище каталога в packages.json (файл переписывается целиком атомарно)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def stamp(self):
+        """Метка для проверки, не изменил ли хранилище другой процесс"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def fingerprint(self):
+        """Хеш содержимого файла: в отличие от mtime не меняется при копировании в деплой"""
+        try:
+            with open(self.path, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def write(self, packages, changes, stamp=None):
+        """Записывает каталог; stamp - метка прочитанной версии (StaleCatalogError, если файл уже другой).
+
+        Возвращает метку записанной версии.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._write_lock():
+            if stamp is not None and self.stamp() != stamp:
+                raise StaleCatalogError(self.path)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".packages-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(packages, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            return self.stamp()
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        # Проверка метки и замена файла - под общей для процессов блокировкой (где есть fcntl)
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+PACKAGES_TABLE = """
+CREATE TABLE IF NOT EXISTS packages (
+    id INTEGER PRIMARY KEY,
+    repo_key TEXT UNIQUE,
+    github_url TEXT,
+    name TEXT,
+    owner_login TEXT,
+    submitted_by TEXT,
+    stars INTEGER,
+    updated_at TEXT,
+    data TEXT NOT NULL
+)
+"""
+
+SCHEMA = PACKAGES_TABLE + """;
+CREATE INDEX IF NOT EXISTS packages_owner_login ON packages (owner_login COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS packages_submitted_by ON packages (submitted_by COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS packages_stars ON packages (stars);
+CREATE INDEX IF NOT EXISTS packages_updated_at ON packages (updated_at);
+CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('version', 0);
+"""
+
+
+COLUMNS = "repo_key, github_url, name, owner_login, submitted_by, stars, updated_at, data"
+
+
+def _columns(package):
+    return (
+        repo_key(package.get("github_url")),
+        package.get("github_url"),
+        package.get("name"),
+        (package.get("owner") or {}).get("login"),
+        package.get("submitted_by"),
+        package.get("stars") or 0,
+        package.get("updated_at"),
+        json.dumps(package),
+    )
+
+
+class SQLiteStorage:
+    """Хранилище каталога в SQLite (режим WAL).
+
+    Каждый пакет - отдельная строка со стабильным первичным ключом;
+    позиция пакета в каталоге соответствует порядку ключей. При записи
+    меняются только изменившиеся строки. Уникальный индекс по repo_key
+    (owner/repo в нижнем регистре) не даёт добавить один репозиторий
+    дважды под разными формами адреса.
+
+    Версия каталога (catalog_meta) увеличивается в той же транзакции,
+    что и запись, и только если она совпадает с прочитанной.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._ids = []
+        conn = self._conn()
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(packages)")}
+        if columns and "repo_key" not in columns:
+            self._migrate(conn)
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    @staticmethod
+    def _migrate(conn):
+        """Старая схема (уникальный github_url) -> уникальный repo_key; id строк сохраняются"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Другой воркер мог успеть перенести таблицу, пока мы ждали блокировку
+            if "repo_key" in {row[1] for row in conn.execute("PRAGMA table_info(packages)")}:
+                conn.rollback()
+                return
+            rows = conn.execute("SELECT id, data FROM packages ORDER BY id").fetchall()
+            seen = set()
+            conn.execute("ALTER TABLE packages RENAME TO packages_old")
+            for name in ("packages_owner_login", "packages_submitted_by", "packages_stars", "packages_updated_at"):
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.execute(PACKAGES_TABLE)
+            for row_id, data in rows:
+                package = json.loads(data)
+                key = repo_key(package.get("github_url"))
+                if key and key in seen:
+                    print(f"Error migrating catalog: duplicate of {key} dropped ({package.get('github_url')})")
+                    continue
+                seen.add(key)
+                conn.execute(f"INSERT INTO packages (id, {COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (row_id,) + _columns(package))
+            conn.execute("DROP TABLE packages_old")
+            conn.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'version'")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def stamp(self):
+        row = self._conn().execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+
+    def fingerprint(self):
+        # Снимок каталога не поддерживается: load() ещё и запоминает id строк
+        return None
+
+    def load(self):
+        rows = self._conn().execute("SELECT id, data FROM packages ORDER BY id").fetchall()
+        self._ids = [row[0] for row in rows]
+        return [json.loads(row[1]) for row in rows]
+
+    def write(self, packages, changes, stamp=None):
+        """Записывает изменения; stamp - прочитанная версия (StaleCatalogError, если она уже не текущая).
+
+        Возвращает новую версию.
+        """
+        conn = self._conn()
+        ids = list(self._ids)
+        try:
+            with conn:
+                # Версия проверяется и увеличивается первой: это же берёт блокировку записи,
+                # так что между проверкой и записью строк другой процесс ничего не запишет
+                if stamp is None:
+                    conn.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'version'")
+                elif conn.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'version' AND value = ?",
+                                  (stamp,)).rowcount == 0:
+                    raise StaleCatalogError(self.path)
+                new_stamp = conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()[0]
+                # Сначала удаляем лишние строки и освобождаем repo_key у изменённых,
+                # чтобы сдвиг записей между строками не нарушил уникальный индекс
+                removed = [ids[i] for i, old, new in changes if new is None]
+                changed_ids = [ids[i] for i, old, new in changes if old is not None and new is not None]
+                conn.executemany("DELETE FROM packages WHERE id = ?", [(row_id,) for row_id in removed])
+                conn.executemany("UPDATE packages SET repo_key = NULL WHERE id = ?",
+                                 [(row_id,) for row_id in changed_ids])
+                for i, old_package, new_package in changes:
+                    if new_package is None:
+                        continue
+                    elif old_package is None:
+                        cursor = conn.execute(
+                            f"INSERT INTO packages ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            _columns(new_package),
+                        )
+                        ids.append(cursor.lastrowid)
+                    else:
+                        conn.execute(
+                            "UPDATE packages SET repo_key = ?, github_url = ?, name = ?, owner_login = ?, "
+                            "submitted_by = ?, stars = ?, updated_at = ?, data = ? WHERE id = ?",
+                            _columns(new_package) + (ids[i],),
+                        )
+        except sqlite3.IntegrityError as e:
+            raise DuplicatePackageError(str(e))
+        removed = set(removed)
+        self._ids = [row_id for row_id in ids if row_id not in removed]
+        return new_stamp
+
+
+def create_storage(backend, path):
+    """Создаёт хранилище каталога: "json" или "sqlite" """
+    if backend == "sqlite":
+        return SQLiteStorage(path)
+    return JsonStorage(path)
+
+
+def import_json(json_path, sqlite_path):
+    """Импортирует packages.json в SQLite-хранилище (пропуская дубликаты репозиториев)"""
+    with open(json_path, "r") as f:
+        packages = json.load(f)
+    storage = SQLiteStorage(sqlite_path)
+    existing = storage.load()
+    seen = {repo_key(p.get("github_url")) for p in existing}
+    new_packages = []
+    for package in packages:
+        key = repo_key(package.get("github_url"))
+        if key and key in seen:
+            continue
+        seen.add(key)
+        new_packages.append(package)
+    changes = [(len(existing) + i, None, p) for i, p in enumerate(new_packages)]
+    storage.write(existing + new_packages, changes)
+    return len(new_packages)
+
+
+def export_json(sqlite_path, json_path):
+    """Выгружает SQLite-хранилище обратно в packages.json"""
+    packages = SQLiteStorage(sqlite_path).load()
+    JsonStorage(json_path).write(packages, None)
+    return len(packages)
+
+
+if __name__ == "__main__":
+    usage = "usage: python storage.py import packages.json catalog.sqlite3 | export catalog.sqlite3 packages.json"
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print(usage)
+        sys.exit(1)
+    command, source, target = sys.argv[1:]
+    if command == "import":
+        print(f"Imported {import_json(source, target)} packages into {target}")
+    else:
+        print(f"Exported {export_json(source, target)} packages to {target}")
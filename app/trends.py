@@ -0,0 +1,301 @@
+import heapq
+import math
+import os
+import pickle
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_right
+
+# Уровни хранения: (шаг в секундах, сколько хранить). Чем старше точки,
+# тем реже они хранятся: остаётся последняя точка каждого шага уровня
+RETENTION_TIERS = [
+    (5 * 60, 2 * 24 * 3600),
+    (3600, 14 * 24 * 3600),
+    (24 * 3600, 400 * 24 * 3600),
+]
+
+# Окна рейтинга "в тренде"
+TRENDING_WINDOWS = {"day": 24 * 3600, "week": 7 * 24 * 3600, "month": 30 * 24 * 3600}
+
+# Точки чаще этого интервала сливаются в одну (всплеск вебхуков или скачиваний)
+MIN_SAMPLE_INTERVAL = 60
+
+# Скачивание весит меньше звезды: их обычно на порядок больше
+DOWNLOAD_WEIGHT = 0.1
+
+# Сколько рядов compute_trending копирует за один захват блокировки
+SNAPSHOT_CHUNK = 2000
+
+
+class Series:
+    """Ряд значений счётчиков пакета: время, звёзды, скачивания (нарастающим итогом).
+
+    Хранится в массивах array, а не в списках словарей; точка
+    добавляется только при изменении значения, поэтому у пакетов без
+    активности ряд состоит из одной-двух точек.
+    """
+
+    __slots__ = ("times", "stars", "downloads", "_appended")
+
+    def __init__(self, times=None, stars=None, downloads=None):
+        self.times = times if times is not None else array("q")
+        self.stars = stars if stars is not None else array("q")
+        self.downloads = downloads if downloads is not None else array("q")
+        self._appended = 0
+
+    def last(self):
+        if not self.times:
+            return None, 0, 0
+        return self.times[-1], self.stars[-1], self.downloads[-1]
+
+    def append(self, timestamp, stars=None, downloads_added=0):
+        last_time, last_stars, last_downloads = self.last()
+        stars = last_stars if stars is None else stars
+        downloads = last_downloads + downloads_added
+        if last_time is not None:
+            if stars == last_stars and downloads == last_downloads:
+                return
+            if timestamp < last_time + MIN_SAMPLE_INTERVAL:
+                # Точка слишком близко к предыдущей - обновляем предыдущую
+                self.stars[-1] = stars
+                self.downloads[-1] = downloads
+                return
+        self.times.append(int(timestamp))
+        self.stars.append(stars)
+        self.downloads.append(downloads)
+        self._appended += 1
+
+    def needs_compaction(self):
+        return self._appended >= 32
+
+    def compact(self, now):
+        """Прореживает старые точки по RETENTION_TIERS (от каждого шага остаётся последняя точка)"""
+        self._appended = 0
+        kept = []
+        previous_bucket = None
+        for i, timestamp in enumerate(self.times):
+            step = _tier_step(now - timestamp)
+            if step is None:
+                # Точки старше последнего уровня отбрасываются, кроме самой новой из них:
+                # она остаётся базой для окон, которые начинаются раньше хранимых точек
+                kept = [i]
+                previous_bucket = None
+                continue
+            bucket = (step, timestamp // step)
+            if bucket == previous_bucket:
+                kept[-1] = i
+            else:
+                kept.append(i)
+            previous_bucket = bucket
+        if len(kept) == len(self.times):
+            return
+        self.times = array("q", (self.times[i] for i in kept))
+        self.stars = array("q", (self.stars[i] for i in kept))
+        self.downloads = array("q", (self.downloads[i] for i in kept))
+
+    def value_at(self, timestamp):
+        """(звёзды, скачивания) на момент timestamp; до первой точки - первая точка"""
+        i = bisect_right(self.times, timestamp) - 1
+        if i < 0:
+            i = 0
+        return self.stars[i], self.downloads[i]
+
+
+def _tier_step(age):
+    for step, keep in RETENTION_TIERS:
+        if age <= keep:
+            return step
+    return None
+
+
+class TrendStore:
+    """Временные ряды звёзд и скачиваний пакетов и рейтинг "в тренде".
+
+    Подписывается на CatalogStore: каждое обновление пакета с новым
+    числом звёзд (фоновое обновление, вебхук, массовое обновление)
+    добавляет точку в ряд. Скачивания учитываются record_download.
+    Рейтинг считается целиком в compute_trending (по расписанию), а
+    запросы читают готовый результат из trending().
+
+    Ряды и последний рейтинг сохраняются в файл (save); при сохранении
+    скачивания, учтённые другими воркерами, складываются с локальными.
+    После перезапуска до первого пересчёта отдаётся рейтинг из файла.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._series = {}  # id пакета -> Series
+        self._ids = {}  # позиция в каталоге -> id пакета
+        self._pending_downloads = {}  # id -> скачивания, ещё не записанные в файл
+        self._rankings = {}
+        self.computed_at = None
+        if path:
+            self._load()
+
+    # Подписчик CatalogStore
+
+    def _record_stars(self, package, timestamp):
+        package_id = package.get("id")
+        if not package_id:
+            return
+        series = self._series.get(package_id)
+        if series is None:
+            series = self._series[package_id] = Series()
+        series.append(timestamp, stars=int(package.get("stars") or 0))
+        if series.needs_compaction():
+            series.compact(time.time())
+
+    def rebuild(self, packages):
+        with self._lock:
+            self._ids = {}
+            for position, package in enumerate(packages):
+                self._ids[position] = package.get("id")
+                self._record_stars(package, package.get("refreshed_at") or package.get("modified_at") or time.time())
+
+    def apply_changes(self, changes):
+        with self._lock:
+            for position, old_package, new_package in changes:
+                if new_package is None:
+                    package_id = self._ids.pop(position, None)
+                    self._series.pop(package_id, None)
+                    continue
+                self._ids[position] = new_package.get("id")
+                if old_package is None or old_package.get("stars") != new_package.get("stars"):
+                    self._record_stars(new_package, new_package.get("modified_at") or time.time())
+
+    # Запись и чтение
+
+    def record_download(self, package_id, timestamp=None):
+        with self._lock:
+            series = self._series.get(package_id)
+            if series is None:
+                return  # пакета нет в каталоге этого воркера
+            series.append(timestamp or time.time(), downloads_added=1)
+            self._pending_downloads[package_id] = self._pending_downloads.get(package_id, 0) + 1
+
+    def growth(self, package_id, window, now=None):
+        """(прирост звёзд, прирост скачиваний) за последние window секунд"""
+        now = now or time.time()
+        with self._lock:
+            series = self._series.get(package_id)
+            if series is None or not series.times:
+                return 0, 0
+            start_stars, start_downloads = series.value_at(now - window)
+            _, stars, downloads = series.last()
+        return stars - start_stars, downloads - start_downloads
+
+    def compute_trending(self, limit=100, now=None):
+        """Пересчитывает рейтинги всех окон TRENDING_WINDOWS (полный проход по рядам).
+
+        Под блокировкой (порциями по SNAPSHOT_CHUNK рядов) ряды только
+        прореживаются и копируются ссылки на их массивы с текущей длиной;
+        сам проход идёт без блокировки, чтобы
+        record_download и growth в цикле событий не ждали пересчёта.
+        Массивы рядов только дописываются, а compact заменяет их новыми,
+        поэтому скопированный префикс не меняется под ногами.
+        """
+        now = now or time.time()
+        with self._lock:
+            items = list(self._series.items())
+        columns = []
+        for offset in range(0, len(items), SNAPSHOT_CHUNK):
+            with self._lock:
+                for package_id, series in items[offset:offset + SNAPSHOT_CHUNK]:
+                    if series.needs_compaction():
+                        series.compact(now)
+                    if series.times:
+                        columns.append((package_id, series.times, series.stars, series.downloads, len(series.times)))
+
+        rankings = {}
+        for name, window in TRENDING_WINDOWS.items():
+            start = now - window
+            candidates = []
+            for package_id, times, stars_column, downloads_column, count in columns:
+                if times[count - 1] < start:
+                    continue  # за окно ничего не менялось
+                i = max(bisect_right(times, start, 0, count) - 1, 0)
+                start_stars = stars_column[i]
+                stars_added = stars_column[count - 1] - start_stars
+                downloads_added = downloads_column[count - 1] - downloads_column[i]
+                if stars_added <= 0 and downloads_added <= 0:
+                    continue
+                # Прирост относительно размера пакета: всплеск у небольшого пакета заметнее
+                score = (stars_added + DOWNLOAD_WEIGHT * downloads_added) / math.log2(max(start_stars, 0) + 2)
+                candidates.append((score, package_id, stars_added, downloads_added, stars_column[count - 1]))
+            rankings[name] = [
+                {"id": package_id, "score": round(score, 3), "stars_added": stars_added,
+                 "downloads_added": downloads_added, "stars": stars}
+                for score, package_id, stars_added, downloads_added, stars in heapq.nlargest(limit, candidates)
+            ]
+        self._rankings = rankings
+        self.computed_at = now
+        return rankings
+
+    def trending(self, window="week", limit=20):
+        """Готовый рейтинг из последнего compute_trending"""
+        return self._rankings.get(window, [])[:limit]
+
+    def is_stale(self, interval):
+        return self.computed_at is None or time.time() - self.computed_at >= interval
+
+    def stats(self):
+        with self._lock:
+            return {
+                "packages": len(self._series),
+                "points": sum(len(series.times) for series in self._series.values()),
+                "computed_at": self.computed_at,
+            }
+
+    # Файл рядов
+
+    def _read_file(self):
+        try:
+            with open(self.path, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error loading trends: {e}")
+            return {}
+
+    def _load(self):
+        data = self._read_file()
+        with self._lock:
+            self._series = {package_id: Series(*columns) for package_id, columns in data.get("series", {}).items()}
+            self._rankings = data.get("rankings", {})
+            self.computed_at = data.get("computed_at")
+
+    def save(self):
+        """Записывает ряды в файл, сначала забирая из него скачивания, учтённые другими воркерами"""
+        if not self.path:
+            return
+        with self._lock:
+            now = time.time()
+            for package_id, (_, _, downloads) in self._read_file().get("series", {}).items():
+                series = self._series.get(package_id)
+                if series is None or not downloads:
+                    continue
+                # Файл содержит наш итог на момент прошлой записи плюс скачивания других воркеров
+                synced = series.last()[2] - self._pending_downloads.get(package_id, 0)
+                if downloads[-1] > synced:
+                    series.append(now, downloads_added=downloads[-1] - synced)
+            self._pending_downloads = {}
+            data = {"series": {package_id: (series.times, series.stars, series.downloads)
+                               for package_id, series in self._series.items()},
+                    "rankings": self._rankings, "computed_at": self.computed_at}
+            # Сериализуем под блокировкой: массивы могут меняться при новых точках
+            payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".trends-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
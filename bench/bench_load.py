@@ -0,0 +1,298 @@
+"""Нагрузочный бенчмарк приложения с локальным фейковым GitHub.
+
+Генерирует синтетический каталог (bench/make_catalog.py), поднимает
+фейковый GitHub API (bench/fake_github.py) и прогоняет сценарии:
+главная, поиск, категории, страница пакета и массовое обновление
+каталога (/admin/update-all-packages). Для каждого сценария считаются
+пропускная способность и задержки p50/p90/p99; результаты пишутся в
+JSON, с которым можно сравнить следующий прогон. Запуск из корня
+репозитория:
+
+    python bench/bench_load.py --packages 10000 -o results.json
+    python bench/bench_load.py --packages 10000 --compare results.json -o new.json
+    python bench/bench_load.py --server uvicorn --workers 4 --latency 50 --rate-limit 5000
+
+--server asgi (по умолчанию) вызывает приложение в том же процессе без
+HTTP-сервера; uvicorn - отдельный процесс с настоящим HTTP.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..", "app")
+
+sys.path.insert(0, BENCH_DIR)
+
+import fake_github  # noqa: E402
+from make_catalog import make_catalog  # noqa: E402
+
+SCENARIOS = ["home", "search", "categories", "package"]
+QUERIES = ["calc", "shell", "утилита", "быстр", "сервер клиент", "ryton парсер", "zzz"]
+
+
+def app_environment(workdir, catalog_path, github_url):
+    """Переменные окружения приложения: всё состояние - во временном каталоге"""
+    return {
+        "CATALOG_BACKEND": "json",
+        "CATALOG_PATH": catalog_path,
+        "CATALOG_SNAPSHOT": "",
+        "GITHUB_API_URL": github_url,
+        "GITHUB_FETCH_BACKEND": "rest",
+        "GITHUB_CACHE_BACKEND": "memory",
+        "ARTIFACT_DIR": os.path.join(workdir, "artifacts"),
+        "BULK_REFRESH_STATE_PATH": os.path.join(workdir, "bulk_refresh_state.json"),
+        "TEMPLATE_CACHE_DIR": os.path.join(workdir, "template_cache"),
+        "SESSION_STORE": "memory",
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(latencies, errors, elapsed):
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "throughput_rps": round(len(ms) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(ms), 2),
+        "p50_ms": round(percentile(ms, 0.50), 2),
+        "p90_ms": round(percentile(ms, 0.90), 2),
+        "p99_ms": round(percentile(ms, 0.99), 2),
+        "max_ms": round(max(ms), 2),
+    }
+
+
+async def run_scenario(client, paths, requests, concurrency, warmup):
+    """Прогоняет requests запросов по путям из paths() в concurrency потоков"""
+    for _ in range(warmup):
+        await client.get(paths())
+
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            path = paths()
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_update_all(client, fake, timeout):
+    """Запускает массовое обновление и ждёт его завершения"""
+    before = sum(fake.requests.values())
+    start = time.perf_counter()
+    await client.get("/admin/update-all-packages")
+    progress = {}
+    while time.perf_counter() - start < timeout:
+        await asyncio.sleep(0.2)
+        progress = (await client.get("/admin/update-all-packages/status")).json()
+        if progress.get("status") != "running":
+            break
+    elapsed = time.perf_counter() - start
+    return {
+        "status": progress.get("status", "unknown") if elapsed < timeout else "timeout",
+        "seconds": round(elapsed, 2),
+        "processed": progress.get("processed", 0),
+        "updated": progress.get("updated", 0),
+        "failed": progress.get("failed", 0),
+        "packages_per_second": round(progress.get("processed", 0) / elapsed, 1) if elapsed else 0,
+        "github_requests": sum(fake.requests.values()) - before,
+    }
+
+
+async def run_benchmark(client, fake, args):
+    index = (await client.get("/index/v1/packages.json")).json()
+    ids = [entry["id"] for entry in index["packages"]]
+    rng = random.Random(args.seed)
+    paths = {
+        "home": lambda: "/",
+        "search": lambda: f"/?q={rng.choice(QUERIES)}",
+        "categories": lambda: "/categories",
+        "package": lambda: f"/package/{rng.choice(ids)}",
+    }
+
+    results = {}
+    for name in args.scenarios:
+        if name == "update-all":
+            continue
+        results[name] = await run_scenario(client, paths[name], args.requests, args.concurrency, args.warmup)
+        print(format_row(name, results[name]))
+    if "update-all" in args.scenarios:
+        results["update-all"] = await run_update_all(client, fake, args.update_timeout)
+        update = results["update-all"]
+        print(f"{'update-all':<12} {update['status']}: {update['processed']} packages in {update['seconds']} s "
+              f"({update['packages_per_second']}/s), {update['github_requests']} GitHub requests")
+    return results
+
+
+def format_row(name, stats):
+    if not stats.get("requests"):
+        return f"{name:<12} no successful requests ({stats.get('errors', 0)} errors)"
+    return (f"{name:<12} {stats['throughput_rps']:>9.1f} rps  p50 {stats['p50_ms']:>8.2f} ms  "
+            f"p90 {stats['p90_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms  errors {stats['errors']}")
+
+
+async def bench_asgi(env, fake, args):
+    # Приложение читает файлы относительно своего каталога и настраивается при импорте
+    os.environ.update(env)
+    os.chdir(APP_DIR)
+    sys.path.insert(0, APP_DIR)
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        results = await run_benchmark(client, fake, args)
+        if main.bulk_refresh.running:
+            main.bulk_refresh._task.cancel()
+        return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def bench_uvicorn(env, fake, args):
+    port = free_port()
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+               "--workers", str(args.workers), "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=APP_DIR, env=dict(os.environ, **env))
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            for _ in range(300):
+                if process.poll() is not None:
+                    raise SystemExit(f"uvicorn exited with code {process.returncode}")
+                try:
+                    await client.get("/metrics")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            return await run_benchmark(client, fake, args)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Печатает изменение пропускной способности и задержек относительно прошлого прогона"""
+    print(f"\nCompared with {previous['meta'].get('revision')} ({previous['meta'].get('timestamp')}):")
+    differing = sorted(key for key, value in current["meta"]["args"].items()
+                       if previous["meta"].get("args", {}).get(key, value) != value)
+    if differing:
+        print(f"  note: runs differ in {', '.join(differing)}")
+    for name, stats in current["results"].items():
+        old = previous["results"].get(name)
+        if not old:
+            continue
+        changes = []
+        for key in ("throughput_rps", "p50_ms", "p99_ms", "packages_per_second"):
+            if old.get(key) and key in stats:
+                changes.append(f"{key} {old[key]} -> {stats[key]} ({(stats[key] - old[key]) / old[key] * 100:+.1f}%)")
+        print(f"  {name:<12} " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", type=int, default=1000, help="размер синтетического каталога")
+    parser.add_argument("--stale", action="store_true", help="все пакеты устарели (страница пакета обновляет их в фоне)")
+    parser.add_argument("--requests", type=int, default=500, help="запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS + ["update-all"],
+                        choices=SCENARIOS + ["update-all"])
+    parser.add_argument("--update-timeout", type=float, default=300, help="сколько ждать массового обновления, с")
+    parser.add_argument("--server", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="воркеров uvicorn")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="куда записать результаты (JSON)")
+    parser.add_argument("--compare", help="результаты прошлого прогона для сравнения")
+    fake_github.add_arguments(parser)
+    args = parser.parse_args()
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    workdir = tempfile.mkdtemp(prefix="ryton-bench-")
+    catalog_path = os.path.join(workdir, "packages.json")
+    with open(catalog_path, "w", encoding="utf-8") as f:
+        json.dump(make_catalog(args.packages, args.seed, args.stale, args.releases), f, ensure_ascii=False)
+
+    fake = fake_github.from_arguments(args)
+    server = fake_github.serve(fake)
+    env = app_environment(workdir, catalog_path, fake.base_url)
+    print(f"{args.packages} packages, {args.requests} requests x {args.concurrency} concurrent, "
+          f"fake GitHub at {fake.base_url}, work dir {workdir}")
+
+    try:
+        bench = bench_uvicorn if args.server == "uvicorn" else bench_asgi
+        results = asyncio.run(bench(env, fake, args))
+    finally:
+        server.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "results": results,
+        "github_requests": dict(fake.requests),
+    }
+    if previous:
+        compare(previous, report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Бенчмарк поискового индекса главной страницы.
+
+Сравнивает SearchIndex с прежним линейным поиском по подстроке на
+синтетических каталогах. Запуск из корня репозитория:
+
+    python bench/bench_search.py --sizes 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from search import SearchIndex  # noqa: E402
+
+WORDS = [
+    "ryton", "shell", "calc", "утилита", "командная", "оболочка", "калькулятор",
+    "сеть", "игра", "редактор", "текст", "парсер", "сервер", "клиент", "графика",
+    "мощная", "простая", "быстрая", "библиотека", "файлы", "менеджер", "ёлка",
+]
+TOPICS = ["utility", "game", "tool", "development", "network", "system", "graphics"]
+LANGUAGES = ["Ryton", "Python", "Zig", None]
+SYLLABLES = ["ra", "to", "ки", "ло", "ne", "ва", "ме", "zi", "до", "сы", "ка", "ли", "fo"]
+QUERIES = ["calc", "shell", "утилита", "быстр", "сервер клиент", "елка", "ryton парсер", "zzz"]
+
+
+def make_vocabulary(rng, size=5000):
+    # Словарь из частых реальных слов и множества редких синтетических
+    words = set(WORDS)
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_packages(count, seed=42):
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    rng.shuffle(weights)
+    packages = []
+    for i in range(count):
+        name = "".join(w.capitalize() for w in rng.sample(WORDS[:6], 2)) + str(i)
+        packages.append({
+            "name": name,
+            "description": " ".join(rng.choices(vocabulary, weights, k=8)).capitalize(),
+            "owner": {"login": f"user{rng.randrange(count // 10 + 1)}"},
+            "topics": rng.sample(TOPICS, rng.randint(0, 2)),
+            "language": rng.choice(LANGUAGES),
+            "stars": int(rng.paretovariate(1.2)) - 1,
+        })
+    return packages
+
+
+def linear_search(packages, q):
+    return [pkg for pkg in packages if q.lower() in pkg["name"].lower() or
+            (pkg.get("description") and q.lower() in pkg["description"].lower())]
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'packages':>9} {'query':>14} {'index p50':>10} {'index p99':>10} "
+          f"{'top-20 p50':>11} {'linear p50':>11} {'hits':>7}")
+    for size in args.sizes:
+        packages = make_packages(size)
+
+        start = time.perf_counter()
+        index = SearchIndex()
+        index.rebuild(packages)
+        print(f"{size:>9} build index: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        index.apply_changes([(0, packages[0], dict(packages[0], name="ReplacedName"))])
+        print(f"{size:>9} incremental update: {(time.perf_counter() - start) * 1000:.3f} ms")
+
+        for q in QUERIES:
+            p50, p99 = measure(lambda: index.search(q), args.repeat)
+            top_p50, _ = measure(lambda: index.search(q, limit=20), args.repeat)
+            linear_p50, _ = measure(lambda: linear_search(packages, q), max(3, args.repeat // 4))
+            hits = len(index.search(q))
+            print(f"{size:>9} {q:>14} {p50:>8.2f}ms {p99:>8.2f}ms {top_p50:>9.2f}ms "
+                  f"{linear_p50:>9.2f}ms {hits:>7}")
+
+        p50, p99 = measure(lambda: index.search("ryton", topic="tool", language="Zig"), args.repeat)
+        print(f"{size:>9} {'ryton+filters':>14} {p50:>8.2f}ms {p99:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
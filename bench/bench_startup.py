@@ -0,0 +1,126 @@
+"""Бенчмарк холодного старта приложения.
+
+Каждый прогон - новый интерпретатор (как холодный старт на Vercel):
+замеряется время импорта main и первых ответов на главную и страницу
+пакета. Запуск из корня репозитория:
+
+    python bench/bench_startup.py --runs 10
+    python bench/bench_startup.py --no-artifacts   # без снимка каталога и байткода шаблонов
+
+Для честного сравнения артефакты собираются заранее: cd app && python startup.py
+Байткод шаблонов каждый прогон берётся из копии во временном каталоге,
+поэтому прогоны не дописывают его ни в app/, ни друг для друга.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+# Выполняется в отдельном процессе; запросы отправляются прямо в ASGI-приложение,
+# чтобы тестовый клиент не добавлял своих импортов
+CHILD = r"""
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+import main
+timings = {"import": time.perf_counter() - start}
+
+async def get(path):
+    sent = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        sent.append(message)
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+             "root_path": "", "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 1),
+             "server": ("localhost", 80)}
+    await main.app(scope, receive, send)
+    return sent[0]["status"]
+
+async def run():
+    pages = [("first /", "/")]
+    packages = main.catalog.all()
+    if packages:
+        pages.append(("first /package", f"/package/{packages[0]['id']}"))
+    for name, path in pages:
+        start = time.perf_counter()
+        status = await get(path)
+        timings[name] = time.perf_counter() - start
+        if status != 200:
+            print(f"{path}: HTTP {status}", file=sys.stderr)
+
+asyncio.run(run())
+print(json.dumps(timings))
+"""
+
+
+def run_once(app_dir, env):
+    if env.get("TEMPLATE_CACHE_DIR"):
+        # Каждый прогон начинает с байткода из сборки, а не с дописанного прошлым прогоном
+        template_cache = env["TEMPLATE_CACHE_DIR"]
+        shutil.rmtree(template_cache, ignore_errors=True)
+        built = os.path.join(app_dir, "template_cache")
+        if os.path.isdir(built):
+            shutil.copytree(built, template_cache)
+    output = subprocess.run([sys.executable, "-c", CHILD], cwd=app_dir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def top_imports(app_dir, env, count):
+    """Самые дорогие прямые импорты main по -X importtime (с зависимостями)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=app_dir, env=env, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Вложенность показана отступом по два пробела: берём только прямые импорты main
+        if len(name) - len(name.lstrip()) != 3:
+            continue
+        modules[name.strip()] = int(cumulative)
+    return sorted(modules.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--app-dir", default=APP_DIR, help="каталог приложения (например, копия с синтетическим каталогом)")
+    parser.add_argument("--no-artifacts", action="store_true", help="игнорировать снимок каталога и байткод шаблонов")
+    parser.add_argument("--top", type=int, default=10, help="сколько самых медленных импортов показать")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ryton-bench-startup-")
+    env = dict(os.environ, TEMPLATE_CACHE_DIR=os.path.join(workdir, "template_cache"))
+    if args.no_artifacts:
+        env["CATALOG_SNAPSHOT"] = ""
+        env["TEMPLATE_CACHE_DIR"] = ""
+
+    try:
+        report(args, env)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def report(args, env):
+    runs = [run_once(args.app_dir, env) for _ in range(args.runs)]
+    print(f"{'stage':<20}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for stage in runs[0]:
+        values = [run[stage] * 1000 for run in runs]
+        print(f"{stage:<20}{statistics.median(values):>12.1f}{min(values):>10.1f}{max(values):>10.1f}")
+
+    print(f"\nTop {args.top} imports (cumulative ms):")
+    for name, microseconds in top_imports(args.app_dir, env, args.top):
+        print(f"  {name:<30}{microseconds / 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Проверка GraphQL-загрузчика против REST на локальном фейковом GitHub.
+
+Прогоняет массовое обновление (/admin/update-all-packages) одного и того
+же устаревшего каталога дважды - с GITHUB_FETCH_BACKEND=rest и =graphql -
+и сравнивает получившиеся записи пакетов: поля из GitHub должны
+совпасть. Печатает число запросов к фейковому GitHub для каждого режима.
+Каждый прогон идёт в отдельном процессе, потому что приложение читает
+настройки при импорте. Запуск из корня репозитория:
+
+    python bench/check_graphql.py --packages 200
+    python bench/check_graphql.py --packages 200 --batch-size 20 --latency 20
+
+Код возврата 1, если результаты различаются.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..", "app")
+
+sys.path.insert(0, BENCH_DIR)
+
+import fake_github  # noqa: E402
+from bench_load import app_environment  # noqa: E402
+from make_catalog import make_catalog  # noqa: E402
+
+BACKENDS = ["rest", "graphql"]
+
+# Поля, которые пишет само обновление, а не GitHub
+IGNORED_FIELDS = {"modified_at", "refreshed_at"}
+
+
+async def refresh_in_process(timeout):
+    """Дочерний процесс: массовое обновление через ASGI, результат - прогресс задачи"""
+    os.chdir(APP_DIR)
+    sys.path.insert(0, APP_DIR)
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check", timeout=60) as client:
+        await client.get("/admin/update-all-packages")
+        start = time.perf_counter()
+        progress = {}
+        while time.perf_counter() - start < timeout:
+            await asyncio.sleep(0.1)
+            progress = (await client.get("/admin/update-all-packages/status")).json()
+            if progress.get("status") != "running":
+                break
+        progress["seconds"] = round(time.perf_counter() - start, 2)
+        return progress
+
+
+def run_backend(backend, catalog, fake, workdir, args):
+    """Обновляет копию каталога в отдельном процессе; возвращает (пакеты, прогресс, запросы к GitHub)"""
+    backend_dir = os.path.join(workdir, backend)
+    os.makedirs(backend_dir)
+    catalog_path = os.path.join(backend_dir, "packages.json")
+    with open(catalog_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False)
+
+    env = dict(os.environ, **app_environment(backend_dir, catalog_path, fake.base_url))
+    env.update({
+        "GITHUB_FETCH_BACKEND": backend,
+        "GITHUB_TOKEN": "check-token",
+        "GITHUB_GRAPHQL_BATCH_SIZE": str(args.batch_size),
+        "ARTIFACT_DIR": "",
+        "TRENDS_PATH": "",
+    })
+    before = dict(fake.requests)
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--timeout", str(args.timeout)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    progress = json.loads(output.strip().splitlines()[-1])
+    requests = {endpoint: count - before.get(endpoint, 0) for endpoint, count in fake.requests.items()
+                if count != before.get(endpoint, 0)}
+
+    with open(catalog_path, encoding="utf-8") as f:
+        return json.load(f), progress, requests
+
+
+def compare(results):
+    """Различия в записях пакетов между режимами: список строк"""
+    differences = []
+    (first_name, first), (second_name, second) = results
+    first_by_id = {package["id"]: package for package in first}
+    second_by_id = {package["id"]: package for package in second}
+    for package_id in sorted(set(first_by_id) | set(second_by_id)):
+        a, b = first_by_id.get(package_id), second_by_id.get(package_id)
+        if a is None or b is None:
+            differences.append(f"{package_id}: only in {first_name if b is None else second_name}")
+            continue
+        for field in sorted((set(a) | set(b)) - IGNORED_FIELDS):
+            if a.get(field) != b.get(field):
+                differences.append(f"{package_id}.{field}: {first_name}={a.get(field)!r} "
+                                   f"{second_name}={b.get(field)!r}")
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", type=int, default=200, help="размер синтетического каталога")
+    parser.add_argument("--batch-size", type=int, default=50, help="репозиториев в одном GraphQL-запросе")
+    parser.add_argument("--timeout", type=float, default=300, help="сколько ждать обновления, с")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    fake_github.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(refresh_in_process(args.timeout))))
+        return
+
+    catalog = make_catalog(args.packages, args.seed, stale=True, releases=args.releases)
+    fake = fake_github.from_arguments(args)
+    server = fake_github.serve(fake)
+    workdir = tempfile.mkdtemp(prefix="ryton-check-graphql-")
+    print(f"{args.packages} packages, fake GitHub at {fake.base_url}, work dir {workdir}")
+
+    results = []
+    try:
+        for backend in BACKENDS:
+            packages, progress, requests = run_backend(backend, catalog, fake, workdir, args)
+            results.append((backend, packages))
+            print(f"{backend:<8} {progress.get('status')}: {progress.get('updated', 0)} updated, "
+                  f"{progress.get('failed', 0)} failed in {progress.get('seconds')} s; "
+                  f"GitHub requests {sum(requests.values())} {dict(sorted(requests.items()))}")
+    finally:
+        server.shutdown()
+
+    differences = compare(results)
+    if differences:
+        print(f"\n{len(differences)} differences between REST and GraphQL:")
+        for line in differences[:50]:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nREST and GraphQL results match")
+
+
+if __name__ == "__main__":
+    main()
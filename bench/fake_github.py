@@ -0,0 +1,328 @@
+"""Локальный фейковый GitHub API для бенчмарков.
+
+Отвечает на запросы, которые делает приложение: репозиторий, релизы
+(с постраничной навигацией и /releases/latest), темы, пользователь,
+отзывы в issues и загрузка .ryx-ассетов, а также POST /graphql с
+запросами repository(...) под алиасами, как их строит
+app/github_graphql.py. Данные детерминированы по owner/repo, поэтому
+совпадают между прогонами и между REST и GraphQL. Поддерживаются
+ETag/304, искусственная задержка и исчерпание лимита запросов (403;
+у REST и GraphQL, как на GitHub, отдельные лимиты). Запуск:
+
+    python bench/fake_github.py --port 8765 --latency 50 --rate-limit 5000
+
+после чего приложение запускается с GITHUB_API_URL=http://127.0.0.1:8765.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+TOPICS = ["ryton", "ryton-package", "utility", "game", "tool", "development", "network", "system", "graphics"]
+LANGUAGES = ["Ryton", "Python", "Zig", None]
+
+ROUTES = [
+    (re.compile(r"^/repos/([^/]+)/([^/]+)$"), "repo"),
+    (re.compile(r"^/repos/([^/]+)/([^/]+)/releases$"), "releases"),
+    (re.compile(r"^/repos/([^/]+)/([^/]+)/releases/latest$"), "latest_release"),
+    (re.compile(r"^/repos/([^/]+)/([^/]+)/topics$"), "topics"),
+    (re.compile(r"^/repos/([^/]+)/([^/]+)/issues$"), "issues"),
+    (re.compile(r"^/users/([^/]+)$"), "user"),
+    (re.compile(r"^/download/([^/]+)/([^/]+)/([^/]+)/[^/]+$"), "download"),
+]
+
+# alias: repository(owner: $o0, name: $n0)
+GRAPHQL_REPOSITORY_RE = re.compile(r"(\w+)\s*:\s*repository\(\s*owner:\s*\$(\w+)\s*,\s*name:\s*\$(\w+)\s*\)")
+
+
+def _date(rng):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_600_000_000 + rng.randrange(150_000_000)))
+
+
+class FakeGitHub:
+    """Генератор ответов фейкового GitHub (без сетевой части, см. serve)"""
+
+    def __init__(self, base_url="", latency=0.0, jitter=0.0, rate_limit=None, rate_window=3600,
+                 releases=3, reviews=2, asset_size=64 * 1024):
+        self.base_url = base_url
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.releases = releases
+        self.reviews = reviews
+        self.asset_size = asset_size
+        self.requests = Counter()  # эндпоинт -> число запросов
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._used = Counter()  # ресурс лимита (core, graphql) -> запросов в окне
+
+    def _rng(self, *parts):
+        seed = hashlib.sha256("/".join(parts).lower().encode()).digest()
+        return random.Random(int.from_bytes(seed[:8], "big"))
+
+    def repo(self, owner, repo):
+        rng = self._rng(owner, repo)
+        stars = int(rng.paretovariate(1.2)) - 1
+        return {
+            "name": repo,
+            "full_name": f"{owner}/{repo}",
+            "description": f"Synthetic package {repo} by {owner}",
+            "stargazers_count": stars,
+            "forks_count": rng.randrange(50),
+            # Как в настоящем API: watchers_count повторяет звёзды, подписчики - subscribers_count
+            "watchers_count": stars,
+            "subscribers_count": rng.randrange(200),
+            "language": rng.choice(LANGUAGES),
+            "open_issues_count": rng.randrange(20),
+            "created_at": _date(rng),
+            "updated_at": _date(rng),
+            "owner": {"login": owner, "avatar_url": f"{self.base_url}/avatars/{owner}"},
+        }
+
+    def release_list(self, owner, repo):
+        rng = self._rng(owner, repo, "releases")
+        releases = []
+        for n in range(self.releases, 0, -1):
+            tag = f"v1.{n}.0"
+            releases.append({
+                "tag_name": tag,
+                "published_at": _date(rng),
+                "draft": False,
+                "prerelease": False,
+                "body": f"Release {tag}",
+                "assets": [{"name": f"{repo}.ryx",
+                            "browser_download_url": f"{self.base_url}/download/{owner}/{repo}/{tag}/{repo}.ryx"}],
+            })
+        return releases
+
+    def topics(self, owner, repo):
+        rng = self._rng(owner, repo, "topics")
+        return {"names": ["ryton"] + rng.sample(TOPICS[1:], rng.randint(0, 3))}
+
+    def user(self, login):
+        return {"login": login, "name": login.title(), "bio": f"Synthetic user {login}",
+                "avatar_url": f"{self.base_url}/avatars/{login}"}
+
+    def issues(self, owner, repo):
+        rng = self._rng(owner, repo, "issues")
+        return [{"title": f"Review: {rng.choice(['great', 'ok', 'needs docs'])}", "body": "Synthetic review",
+                 "user": {"login": f"reviewer{n}", "avatar_url": ""}, "created_at": _date(rng),
+                 "html_url": f"https://github.com/{owner}/{repo}/issues/{n + 1}", "state": "open"}
+                for n in range(self.reviews)]
+
+    def asset(self, owner, repo, tag):
+        rng = self._rng(owner, repo, tag, "asset")
+        return rng.randbytes(self.asset_size)
+
+    def repository_node(self, owner, repo):
+        """Репозиторий в форме ответа GraphQL: те же данные, что у REST-эндпоинтов"""
+        data = self.repo(owner, repo)
+        user = self.user(owner)
+
+        def release_node(release):
+            return {"tagName": release["tag_name"], "publishedAt": release["published_at"],
+                    "description": release["body"], "isDraft": release["draft"],
+                    "isPrerelease": release["prerelease"],
+                    "releaseAssets": {"nodes": [{"name": asset["name"], "downloadUrl": asset["browser_download_url"]}
+                                                for asset in release["assets"]]}}
+
+        releases = self.release_list(owner, repo)
+        return {
+            "name": data["name"],
+            "description": data["description"],
+            "stargazerCount": data["stargazers_count"],
+            "forkCount": data["forks_count"],
+            "createdAt": data["created_at"],
+            "updatedAt": data["updated_at"],
+            "watchers": {"totalCount": data["subscribers_count"]},
+            "primaryLanguage": {"name": data["language"]} if data["language"] else None,
+            # В REST open_issues_count - это issues и pull request'ы вместе
+            "issues": {"totalCount": data["open_issues_count"]},
+            "pullRequests": {"totalCount": 0},
+            "owner": {"login": owner, "avatarUrl": data["owner"]["avatar_url"], "name": user["name"],
+                      "bio": user["bio"]},
+            "latestRelease": release_node(releases[0]) if releases else None,
+            "releases": {"nodes": [release_node(release) for release in releases[:10]]},
+            "repositoryTopics": {"nodes": [{"topic": {"name": name}} for name in self.topics(owner, repo)["names"]]},
+        }
+
+    def _take_rate_limit(self, resource="core"):
+        """(остаток, время сброса) после учёта запроса; остаток < 0 - лимит исчерпан"""
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= self.rate_window:
+                self._window_start = now
+                self._used.clear()
+            self._used[resource] += 1
+            reset = int(self._window_start + self.rate_window)
+            if self.rate_limit is None:
+                return 5000, reset
+            return self.rate_limit - self._used[resource], reset
+
+    def _rate_headers(self, resource, remaining, reset):
+        return {"X-RateLimit-Limit": str(self.rate_limit or 5000), "X-RateLimit-Remaining": str(max(remaining, 0)),
+                "X-RateLimit-Reset": str(reset), "X-RateLimit-Resource": resource}
+
+    def _delay(self):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def handle_graphql(self, body, headers):
+        """Ответ на POST /graphql: (статус, заголовки, тело)"""
+        with self._lock:
+            self.requests["graphql"] += 1
+        self._delay()
+        if not (headers.get("Authorization") or "").lower().startswith(("bearer ", "token ")):
+            return 401, {"Content-Type": "application/json"}, b'{"message": "This endpoint requires you to be authenticated."}'
+
+        remaining, reset = self._take_rate_limit("graphql")
+        rate_headers = self._rate_headers("graphql", remaining, reset)
+        if remaining < 0:
+            body = {"errors": [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]}
+            return 403, rate_headers, json.dumps(body).encode()
+        try:
+            request = json.loads(body)
+            query, variables = request["query"], request.get("variables") or {}
+        except (ValueError, KeyError, TypeError):
+            return 400, rate_headers, b'{"message": "Problems parsing JSON"}'
+
+        data = {}
+        for alias, owner_var, name_var in GRAPHQL_REPOSITORY_RE.findall(query):
+            data[alias] = self.repository_node(variables[owner_var], variables[name_var])
+        response_headers = dict(rate_headers, **{"Content-Type": "application/json"})
+        return 200, response_headers, json.dumps({"data": data}).encode()
+
+    def handle(self, path, query, headers):
+        """Ответ на GET-запрос: (статус, заголовки, тело)"""
+        for pattern, endpoint in ROUTES:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            endpoint, match = "not_found", None
+        with self._lock:
+            self.requests[endpoint] += 1
+
+        self._delay()
+
+        if endpoint == "download":
+            return 200, {"Content-Type": "application/octet-stream"}, self.asset(*match.groups())
+
+        remaining, reset = self._take_rate_limit()
+        rate_headers = self._rate_headers("core", remaining, reset)
+        if remaining < 0:
+            body = {"message": "API rate limit exceeded", "documentation_url": "https://docs.github.com/rest"}
+            return 403, rate_headers, json.dumps(body).encode()
+
+        link = None
+        if endpoint == "repo":
+            data = self.repo(*match.groups())
+        elif endpoint == "releases":
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            releases = self.release_list(*match.groups())
+            data = releases[(page - 1) * per_page:page * per_page]
+            if page * per_page < len(releases):
+                link = f'<{self.base_url}{path}?per_page={per_page}&page={page + 1}>; rel="next"'
+        elif endpoint == "latest_release":
+            data = self.release_list(*match.groups())[0] if self.releases else None
+        elif endpoint == "topics":
+            data = self.topics(*match.groups())
+        elif endpoint == "issues":
+            data = self.issues(*match.groups())
+        elif endpoint == "user":
+            data = self.user(*match.groups())
+        else:
+            data = None
+        if data is None:
+            return 404, rate_headers, b'{"message": "Not Found"}'
+
+        body = json.dumps(data).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        response_headers = dict(rate_headers, ETag=etag, **{"Content-Type": "application/json"})
+        if link:
+            response_headers["Link"] = link
+        # Как и настоящий GitHub, 304 не расходует лимит запросов
+        if headers.get("If-None-Match") == etag:
+            with self._lock:
+                self._used["core"] -= 1
+            response_headers["X-RateLimit-Remaining"] = str(max(remaining + 1, 0))
+            return 304, response_headers, b""
+        return 200, response_headers, body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = unquote(parsed.path).rstrip("/")
+        self._respond(*self.server.fake.handle(path, parse_qs(parsed.query), self.headers))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if urlparse(self.path).path.rstrip("/") == "/graphql":
+            self._respond(*self.server.fake.handle_graphql(body, self.headers))
+        else:
+            self._respond(404, {"Content-Type": "application/json"}, b'{"message": "Not Found"}')
+
+    def _respond(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(fake, host="127.0.0.1", port=0):
+    """Запускает сервер в фоновом потоке и возвращает его (server.server_port, server.shutdown())"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.fake = fake
+    if not fake.base_url:
+        fake.base_url = f"http://{host}:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, мс")
+    parser.add_argument("--jitter", type=float, default=0.0, help="разброс задержки, мс")
+    parser.add_argument("--rate-limit", type=int, default=None, help="лимит запросов за окно (по умолчанию без лимита)")
+    parser.add_argument("--rate-window", type=int, default=3600, help="окно лимита, с")
+    parser.add_argument("--releases", type=int, default=3, help="релизов у каждого репозитория")
+
+
+def from_arguments(args):
+    return FakeGitHub(latency=args.latency / 1000, jitter=args.jitter / 1000, rate_limit=args.rate_limit,
+                      rate_window=args.rate_window, releases=args.releases)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = serve(from_arguments(args), args.host, args.port)
+    print(f"Fake GitHub API on {server.fake.base_url} (GITHUB_API_URL={server.fake.base_url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Генератор синтетического packages.json для бенчмарков.
+
+Пакеты в формате каталога приложения; github_url указывают на
+репозитории, которые отдаёт bench/fake_github.py. Запуск из корня
+репозитория:
+
+    python bench/make_catalog.py 10000 -o /tmp/ryton-bench/packages.json
+    python bench/make_catalog.py 1000 --stale   # все пакеты требуют обновления с GitHub
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_search import make_packages  # noqa: E402
+
+
+def make_catalog(count, seed=42, stale=False, releases=3):
+    rng = random.Random(seed)
+    now = time.time()
+    catalog = []
+    for i, package in enumerate(make_packages(count, seed)):
+        login = package["owner"]["login"]
+        repo = package["name"]
+        versions = [f"v1.{n}.0" for n in range(releases, 0, -1)]
+        history = [{"version": version, "published_at": "01 Jan 2025", "prerelease": False,
+                    "download_url": f"https://github.com/{login}/{repo}/releases/download/{version}/{repo}.ryx"}
+                   for version in versions]
+        topics = ["ryton"] + package["topics"]
+        record = {
+            "name": repo,
+            "description": package["description"],
+            "github_url": f"https://github.com/{login}/{repo}",
+            "owner": {"login": login, "avatar_url": "", "name": login.title(), "bio": "", "status": None},
+            "download_url": history[0]["download_url"] if history else "",
+            "published_at": "01 Jan 2025",
+            "stars": package["stars"],
+            "forks": rng.randrange(50),
+            "watchers": rng.randrange(200),
+            "language": package["language"],
+            "open_issues": rng.randrange(20),
+            "created_at": "01 Jan 2024",
+            "updated_at": f"{rng.randint(1, 28):02d} {rng.choice(['Jan', 'Feb', 'Mar', 'Apr'])} 2025",
+            "version": versions[0] if versions else "",
+            "release_notes": "",
+            "topics": [t for t in topics if t != "ryton"],
+            "all_topics": topics,
+            "releases": history,
+        }
+        if not stale:
+            record["refreshed_at"] = now
+        catalog.append(record)
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("count", type=int, help="число пакетов (например, 1000-100000)")
+    parser.add_argument("-o", "--output", default="packages.json")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stale", action="store_true", help="не проставлять refreshed_at")
+    parser.add_argument("--releases", type=int, default=3, help="версий в истории каждого пакета")
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.count, args.seed, args.stale, args.releases)
+    directory = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=2)
+    print(f"Wrote {len(catalog)} packages to {args.output}")
+
+
+if __name__ == "__main__":
+    main()